@@ -1,28 +1,28 @@
-import os, requests
+import json
+import os
 from functools import wraps
 
-from flask import Flask, redirect, render_template, session, url_for, request
-from flask_jwt_extended import JWTManager, verify_jwt_in_request
+from flask import Flask, Response, redirect, render_template, session, url_for, request, stream_with_context
+from flask_jwt_extended import JWTManager, get_jwt_identity, verify_jwt_in_request
 from dotenv import load_dotenv
 from datetime import date, datetime, timedelta
-from chatbot.chatbot_logic import ask_movie_bot
-from models import Booking, Movie, db
+from chatbot import answer_cache, jobs, knowledge
+from chatbot.chatbot_logic import OLLAMA_TIMEOUT, ollama_stats, quick_reply, start_warmup
+from models import Booking, Movie, SeatHold, Showtime, db
+import catalog
+import holds
+import omdb
+import pagination
 from routes.auth_routes import auth_bp
 from routes.booking_routes import booking_bp
+from routes.movie_routes import movie_bp
+from routes.poster_routes import poster_bp
 from routes.user_routes import user_bp
+import showtimes
 from models import User
 
 load_dotenv()
 
-OMDB_API_KEY = "225f5d3d"
-OMDB_URL = "http://www.omdbapi.com/"
-
-set_showtimes = [
-    {"time": "2:00 PM", "available": 15},
-    {"time": "5:30 PM", "available": 9},
-    {"time": "8:00 PM", "available": 20},
-]
-
 app = Flask(__name__)
 # Configure SQLite Database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
@@ -38,11 +38,24 @@ db.init_app(app)
 jwt = JWTManager(app)
 app.register_blueprint(auth_bp)
 app.register_blueprint(booking_bp)
+app.register_blueprint(movie_bp)
+app.register_blueprint(poster_bp)
 app.register_blueprint(user_bp)
 
 with app.app_context():
     db.create_all()
 
+catalog.start_refresh_worker(app)
+holds.start_sweeper(app)
+start_warmup()
+
+
+@app.cli.command("refresh-movies")
+def refresh_movies_command():
+    """Re-fetch stale OMDB details for every movie in the catalog."""
+    count = catalog.refresh_stale_movies()
+    print(f"Refreshed details for {count} movie(s)")
+
 @app.context_processor
 def inject_user_context():
     return {
@@ -75,45 +88,160 @@ def home():
     movies = Movie.query.all()
     return render_template("home.html", movies=movies)
 
-@app.route("/api/chat", methods=["POST"])
-@login_required_view
-def movie_chat():
+def _chat_message():
     if not request.is_json:
-        return {"error": "JSON body required"}, 400
+        return None, ({"error": "JSON body required"}, 400)
 
     message = (request.json.get("message") or "").strip()
     if not message:
-        return {"error": "Empty message"}, 400
+        return None, ({"error": "Empty message"}, 400)
+    return message, None
+
+def _queue_full_response():
+    # Shed load instead of letting chat requests pile up behind the LLM
+    return {"error": "The movie assistant is busy, please try again shortly."}, 503, {"Retry-After": "5"}
+
+def _own_job(job_id):
+    job = jobs.get_job(job_id)
+    if job is None or job.username != get_jwt_identity():
+        return None
+    return job
+
+def _sse(tokens):
+    def events():
+        for token in tokens:
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _job_events(job_id):
+    # The web thread only relays progress; generation happens on the chat worker pool
+    return _sse(jobs.follow(job_id, OLLAMA_TIMEOUT))
+
+@app.route("/api/chat", methods=["POST"])
+@login_required_view
+def movie_chat():
+    message, error = _chat_message()
+    if error:
+        return error
+
+    # Catalog and answer-cache replies never need the worker pool
+    reply, plan = quick_reply(message, get_jwt_identity())
+    if reply is not None:
+        return {"reply": reply}
+
+    try:
+        job_id = jobs.submit(get_jwt_identity(), message, plan)
+    except jobs.QueueFull:
+        return _queue_full_response()
+
+    answer = "".join(jobs.follow(job_id, OLLAMA_TIMEOUT)).strip()
+    return {"reply": answer or "LLM Error."}
+
+@app.route("/api/chat/stream", methods=["POST"])
+@login_required_view
+def movie_chat_stream():
+    # Relay the reply as Server-Sent Events so the first tokens show up immediately
+    message, error = _chat_message()
+    if error:
+        return error
 
-    answer = ask_movie_bot(message)
-    return {"reply": answer}
+    reply, plan = quick_reply(message, get_jwt_identity())
+    if reply is not None:
+        return _sse([reply])
+
+    try:
+        job_id = jobs.submit(get_jwt_identity(), message, plan)
+    except jobs.QueueFull:
+        return _queue_full_response()
+
+    return _job_events(job_id)
+
+@app.route("/api/chat/jobs", methods=["POST"])
+@login_required_view
+def submit_chat_job():
+    # Queue the question and return immediately; the reply is generated by the chat worker pool
+    message, error = _chat_message()
+    if error:
+        return error
+
+    # Questions the catalog or answer cache can settle are answered here, with nothing to poll
+    reply, plan = quick_reply(message, get_jwt_identity())
+    if reply is not None:
+        return {"status": "done", "reply": reply, "done": True}
+
+    try:
+        job_id = jobs.submit(get_jwt_identity(), message, plan)
+    except jobs.QueueFull:
+        return _queue_full_response()
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("chat_job_status", job_id=job_id),
+        "events_url": url_for("chat_job_events", job_id=job_id),
+    }, 202
+
+@app.route("/api/chat/jobs/<job_id>")
+@login_required_view
+def chat_job_status(job_id):
+    job = _own_job(job_id)
+    if job is None:
+        return {"error": "Job not found"}, 404
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "reply": jobs.current_reply(job),
+        "done": job.status in jobs.FINISHED,
+    }
+
+@app.route("/api/chat/jobs/<job_id>/events")
+@login_required_view
+def chat_job_events(job_id):
+    if _own_job(job_id) is None:
+        return {"error": "Job not found"}, 404
+    return _job_events(job_id)
+
+@app.route("/health/omdb")
+def omdb_health():
+    # Breaker and cache state for monitoring
+    return omdb.status()
+
+@app.route("/health/chat")
+def chat_health():
+    # Answer cache, job queue and Ollama slot counters for monitoring
+    return {"answer_cache": answer_cache.stats(), "jobs": jobs.stats(), "ollama": ollama_stats()}
 
 @app.route("/movie/<movie_id>")
 @login_required_view
 def movie_detail(movie_id):
-    # Get movie from DB (does not contain full movie data)
     movie = Movie.query.filter_by(imdb_id=movie_id).first()
     if not movie:
         return "Movie not found", 404
 
-    # Fetch full OMDB data
-    omdb_data = requests.get(
-        f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&i={movie.imdb_id}&plot=full"
-    ).json()
+    # Details are captured at add time; only backfill movies that predate that
+    if movie.refreshed_at is None and catalog.fetch_details(movie):
+        db.session.commit()
 
-    # Build a full movie detail object
     movie_details = {
         "title": movie.title,
-        "poster": omdb_data.get("Poster"),
-        "director": omdb_data.get("Director"),
-        "studio": omdb_data.get("Production"),
-        "genre": omdb_data.get("Genre"),
-        "rating": omdb_data.get("imdbRating"),
-        "runtime": omdb_data.get("Runtime"),
-        "actors": omdb_data.get("Actors"),
-        "plot": omdb_data.get("Plot"),
-        "released": omdb_data.get("Released"),
-        "imdb_id": movie.imdb_id
+        "poster": movie.poster,
+        "director": movie.director,
+        "studio": movie.production,
+        "genre": movie.genre,
+        "rating": movie.rating,
+        "runtime": movie.runtime,
+        "actors": movie.actors,
+        "plot": movie.plot,
+        "released": movie.released,
+        "imdb_id": movie.imdb_id,
+        "stale": catalog.details_are_stale(movie),
     }
 
     return render_template("movie.html", movie=movie_details)
@@ -124,7 +252,7 @@ def booking(movie_id):
     movie = Movie.query.filter_by(imdb_id=movie_id).first()
     return render_template(
         "booking.html", movie=movie, 
-        showtimes=set_showtimes, 
+        showtimes=showtimes.availability(movie, date.today()), 
         existing_booking=None, 
         today=date.today().isoformat()        
     )
@@ -142,7 +270,7 @@ def edit_booking(booking_id):
     if not is_admin and booking_record.booked_by != username:
         return redirect(url_for("bookings"))
 
-    movie = Movie.query.filter_by(title=booking_record.movie_title).first()
+    movie = booking_record.movie
     if not movie:
         movie = {
             "id": 0,
@@ -155,7 +283,7 @@ def edit_booking(booking_id):
 
     existing_booking = {
         "id": booking_record.id,
-        "show_date": booking_record.show_date,
+        "show_date": booking_record.show_date.isoformat(),
         "showtime": booking_record.showtime,
         "quantity": booking_record.quantity,
     }
@@ -163,7 +291,7 @@ def edit_booking(booking_id):
     return render_template(
         "booking.html",
         movie=movie,
-        showtimes=set_showtimes,
+        showtimes=showtimes.availability(movie if isinstance(movie, Movie) else None, booking_record.show_date),
         existing_booking=existing_booking,
         today=date.today().isoformat()
     )
@@ -175,16 +303,23 @@ def bookings():
     if not username:
         return redirect(url_for("auth.login"))
 
-    user_bookings = (
-        Booking.query.filter_by(booked_by=username)
-        .order_by(Booking.created_at.desc())
-        .all()
-    )
+    user = User.query.filter_by(username=username).first()
+    user_bookings, next_cursor = [], None
+    if user:
+        try:
+            user_bookings, next_cursor = pagination.paginate(
+                Booking.query.filter_by(user_id=user.id),
+                [Booking.created_at, Booking.id],
+                request.args.get("cursor"),
+                pagination.page_limit(request.args.get("limit"), default=20),
+            )
+        except pagination.InvalidPage:
+            return redirect(url_for("bookings"))
     booking_payload = [
         {
             "id": b.id,
             "movie_title": b.movie_title,
-            "show_date": b.show_date,
+            "show_date": b.show_date.isoformat(),
             "showtime": b.showtime,
             "quantity": b.quantity,
             "booked_by": b.booked_by,
@@ -197,6 +332,8 @@ def bookings():
         bookings=user_bookings,
         username=username,
         bookings_payload=booking_payload,
+        next_cursor=next_cursor,
+        first_page=not request.args.get("cursor"),
     )
 
 @app.route("/admin")
@@ -231,13 +368,12 @@ def search_movies():
     if not query:
         return {"error": "Missing query"}, 400
 
-    url = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&s={query}&type=movie"
-    res = requests.get(url).json()
-
-    if res.get("Response") == "False":
-        return {"results": []}
+    try:
+        results = omdb.search_titles(query)
+    except omdb.OmdbUnavailable:
+        return {"results": [], "error": "Movie search is temporarily unavailable"}, 503
 
-    return {"results": res.get("Search", [])}
+    return {"results": results}
 
 @app.route("/admin/add-movie", methods=["POST"])
 @login_required_view
@@ -269,8 +405,12 @@ def add_movie():
         poster=poster,
         expiration=expiration
     )
+    # Capture the full OMDB record now so views never need to call out for it
+    catalog.fetch_details(new_movie)
     db.session.add(new_movie)
     db.session.commit()
+    knowledge.sync_knowledge()
+    answer_cache.clear()
 
     return {"message": "Movie added"}
 
@@ -285,8 +425,15 @@ def remove_movie():
 
     movie = Movie.query.filter_by(imdb_id=imdb_id).first()
     if movie:
+        showing_ids = db.session.query(Showtime.id).filter_by(movie_id=movie.id)
+        SeatHold.query.filter(SeatHold.showtime_id.in_(showing_ids)).delete(synchronize_session=False)
+        Showtime.query.filter_by(movie_id=movie.id).delete(synchronize_session=False)
+        # Past bookings keep their title but no longer point at the catalog
+        Booking.query.filter_by(movie_id=movie.id).update({"movie_id": None}, synchronize_session=False)
         db.session.delete(movie)
         db.session.commit()
+        knowledge.sync_knowledge()
+        answer_cache.clear()
 
     return {"message": "Movie removed"}
 
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from chatbot import knowledge
+from models import KnowledgeEntry, Movie, db
+import omdb
+
+try:
+    MOVIE_REFRESH_INTERVAL_SECONDS = int(os.getenv("MOVIE_REFRESH_INTERVAL_SECONDS", "0"))
+except ValueError:
+    MOVIE_REFRESH_INTERVAL_SECONDS = 0
+try:
+    MOVIE_REFRESH_MAX_AGE_SECONDS = int(os.getenv("MOVIE_REFRESH_MAX_AGE_SECONDS", "86400"))
+except ValueError:
+    MOVIE_REFRESH_MAX_AGE_SECONDS = 86400
+
+
+def fetch_details(movie, refresh=False):
+    """Store the full OMDB record on movie (caller commits). Returns True on success."""
+    try:
+        return omdb.apply_details(movie, omdb.get_movie(movie.imdb_id, plot="full", refresh=refresh))
+    except Exception as exc:
+        print(f"Could not fetch details for {movie.imdb_id}:", exc)
+        return False
+
+
+def details_are_stale(movie):
+    """True when the stored record is missing, or overdue while OMDB is unavailable."""
+    if movie.refreshed_at is None:
+        return True
+    overdue = movie.refreshed_at < datetime.now() - timedelta(seconds=MOVIE_REFRESH_MAX_AGE_SECONDS)
+    return overdue and omdb.breaker.state != "closed"
+
+
+def refresh_stale_movies(max_age=None):
+    """Re-fetch details older than max_age seconds (or never fetched). Returns the count refreshed."""
+    max_age = MOVIE_REFRESH_MAX_AGE_SECONDS if max_age is None else max_age
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=max_age)
+    movies = Movie.query.filter(
+        db.or_(Movie.refreshed_at.is_(None), Movie.refreshed_at < cutoff)
+    ).all()
+
+    refreshed = [m.imdb_id for m in movies if fetch_details(m, refresh=True)]
+    db.session.commit()
+
+    if refreshed:
+        # Expire the matching chatbot summaries so they are rebuilt from the new details
+        KnowledgeEntry.query.filter(KnowledgeEntry.imdb_id.in_(refreshed)).update(
+            {"expires_at": now}, synchronize_session=False
+        )
+        db.session.commit()
+        knowledge.sync_knowledge()
+    return len(refreshed)
+
+
+def _refresh_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                count = refresh_stale_movies()
+            if count:
+                print(f"Refreshed details for {count} movie(s)")
+        except Exception as exc:
+            print("Movie refresh failed:", exc)
+
+
+def start_refresh_worker(app, interval=None):
+    interval = MOVIE_REFRESH_INTERVAL_SECONDS if interval is None else interval
+    if interval <= 0:
+        return None
+    worker = threading.Thread(target=_refresh_loop, args=(app, interval), daemon=True, name="movie-refresh")
+    worker.start()
+    return worker
@@ -0,0 +1,62 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from chatbot import knowledge
+from omdb import LRUCache
+
+try:
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+except ValueError:
+    ANSWER_CACHE_MAX_ENTRIES = 1000
+try:
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+except ValueError:
+    ANSWER_CACHE_TTL_SECONDS = 3600
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+_replies = LRUCache(ANSWER_CACHE_MAX_ENTRIES)
+_stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def normalize(question):
+    return " ".join(_PUNCTUATION_RE.sub(" ", question.lower()).split())
+
+
+def key_for(question):
+    # The catalog version is part of the key, so any add/remove on any worker retires old replies
+    version = knowledge.get_snapshot()[0]
+    return f"{version}:{normalize(question)}"
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get(key):
+    reply = _replies.get(key)
+    _count("misses" if reply is None else "hits")
+    return reply
+
+
+def store(key, reply):
+    _replies.set(key, reply, datetime.now() + timedelta(seconds=ANSWER_CACHE_TTL_SECONDS))
+    _count("stores")
+
+
+def clear():
+    _replies.clear()
+    _count("invalidations")
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["entries"] = len(_replies)
+    snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 4) if lookups else 0.0
+    return snapshot
@@ -1,46 +1,204 @@
-import os, requests
-from models import Movie
+import json
+import os
+import re
+import threading
+from datetime import date
+from contextlib import contextmanager
+
+from chatbot import answer_cache, conversation, retrieval
+import http_client
+from models import Movie, db
+import showtimes
 
-OMDB_API_KEY = "225f5d3d"
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:1b")
+try:
+    OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+except ValueError:
+    OLLAMA_TIMEOUT = 60.0
+try:
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+except ValueError:
+    OLLAMA_MAX_CONCURRENCY = 2
+try:
+    OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "30"))
+except ValueError:
+    OLLAMA_QUEUE_TIMEOUT = 30.0
+# How long Ollama keeps the model loaded after a request (Ollama duration syntax)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") != "0"
+
+BUSY_REPLY = "The movie assistant is busy, please try again shortly."
+
+
+class OllamaBusy(Exception):
+    pass
+
+
+_generation_slots = threading.BoundedSemaphore(OLLAMA_MAX_CONCURRENCY)
+_slot_stats = {"in_flight": 0, "waiting": 0, "rejected": 0}
+_slot_stats_lock = threading.Lock()
+
+
+def _bump(stat, delta):
+    with _slot_stats_lock:
+        _slot_stats[stat] += delta
+
+
+@contextmanager
+def generation_slot(timeout=None):
+    """Hold one of the OLLAMA_MAX_CONCURRENCY generation slots; raises OllamaBusy after timeout."""
+    timeout = OLLAMA_QUEUE_TIMEOUT if timeout is None else timeout
+    _bump("waiting", 1)
+    acquired = _generation_slots.acquire(timeout=timeout)
+    _bump("waiting", -1)
+    if not acquired:
+        _bump("rejected", 1)
+        raise OllamaBusy()
+    _bump("in_flight", 1)
+    try:
+        yield
+    finally:
+        _bump("in_flight", -1)
+        _generation_slots.release()
+
 
-def build_movie_knowledge():
-    """Return detailed movie summaries using both DB and OMDB."""
-    movies = Movie.query.all()
-    if not movies:
-        return "No movies available."
-
-    details = []
-    for m in movies:
-        try:
-            omdb_data = requests.get(
-                f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&i={m.imdb_id}&plot=short"
-            ).json()
-
-            actors = omdb_data.get("Actors", "Unknown actors")
-            genre = omdb_data.get("Genre", "Unknown genre")
-            plot = omdb_data.get("Plot", "No plot available")
-            rating = omdb_data.get("imdbRating", "N/A")
-
-            details.append(
-                f"Title: {m.title}. Genre: {genre}. Actors: {actors}. "
-                f"Rating: {rating}. Plot: {plot}"
+def generate(prompt, stream=False):
+    """POST a generation request to Ollama; the caller must hold a generation slot."""
+    return http_client.post(
+        f"{OLLAMA_URL}/api/generate",
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+        },
+        # When streaming, the read timeout bounds the gap between tokens, not the whole reply
+        timeout=(http_client.HTTP_CONNECT_TIMEOUT, OLLAMA_TIMEOUT),
+        stream=stream,
+    )
+
+
+def warm_up():
+    # An empty prompt makes Ollama load the model without generating anything
+    try:
+        with generation_slot():
+            res = http_client.post(
+                f"{OLLAMA_URL}/api/generate",
+                json={"model": OLLAMA_MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=(http_client.HTTP_CONNECT_TIMEOUT, OLLAMA_TIMEOUT),
             )
+            res.raise_for_status()
+        return True
+    except Exception as exc:
+        print("Ollama warm-up failed:", exc)
+        return False
+
+
+def start_warmup():
+    if not OLLAMA_WARMUP:
+        return None
+    worker = threading.Thread(target=warm_up, daemon=True, name="ollama-warmup")
+    worker.start()
+    return worker
+
+
+def ollama_stats():
+    with _slot_stats_lock:
+        snapshot = dict(_slot_stats)
+    snapshot["max_concurrency"] = OLLAMA_MAX_CONCURRENCY
+    return snapshot
+
+# Structured questions answered straight from the catalog, checked in this order
+INTENT_PATTERNS = [
+    ("rating", re.compile(r"\b(rating|rated|imdb|score)\b")),
+    ("actors", re.compile(r"\b(stars?|starring|actors?|actress|cast|who s in|who is in)\b")),
+    ("genre", re.compile(r"\b(genres?|what kind of|what type of)\b")),
+    ("runtime", re.compile(r"\b(runtime|run time|how long|length)\b")),
+    ("showtimes", re.compile(r"\b(showtimes?|show times?|what time|when is|when can)\b")),
+]
+PLAYING_RE = re.compile(r"\b(what s playing|whats playing|what is playing|now showing|what movies|which movies)\b")
+
+
+def _known(value):
+    return value and value != "N/A"
+
 
-        except Exception as e:
-            print("Error occured:", e)
-            details.append(f"Title: {m.title}. Limited info available.")
+def _find_movie(question, movies):
+    # Longest title wins so "Black Phone 2" is not mistaken for "Black Phone"
+    padded = f" {question} "
+    matches = [m for m in movies if f" {answer_cache.normalize(m.title)} " in padded]
+    return max(matches, key=lambda m: len(m.title)) if matches else None
 
-    return "\n".join(details)
 
+def _describe(intent, movie):
+    title = movie.title
+    if intent == "rating":
+        if not _known(movie.rating):
+            return f"I don't have a rating for {title}."
+        return f"{title} is rated {movie.rating}/10 on IMDb."
+    if intent == "actors":
+        if not _known(movie.actors):
+            return f"I don't have the cast for {title}."
+        return f"{title} stars {movie.actors}."
+    if intent == "genre":
+        if not _known(movie.genre):
+            return f"I don't have the genre for {title}."
+        return f"{title} is {movie.genre}."
+    if intent == "runtime":
+        if not _known(movie.runtime):
+            return f"I don't have the runtime for {title}."
+        return f"{title} runs {movie.runtime}."
+    times = ", ".join(
+        f"{s['time']} ({s['available']} seats left)" if s["available"] else f"{s['time']} (sold out)"
+        for s in showtimes.availability(movie, date.today())
+    )
+    return f"{title} is showing today at {times}."
 
 
-def ask_movie_bot(user_message: str) -> str:
-    """Send a prompt to Ollama using the movies in the DB as context."""
-    context = build_movie_knowledge()
+def answer_structured(user_message: str, last_movie=None):
+    """Answer common metadata questions from the catalog without the LLM.
 
-    prompt = f"""
+    Returns (reply, movie): reply is None when the LLM has to answer, and
+    movie is the catalog movie the question is about, when one was found.
+    last_movie is the title discussed most recently, used when a follow-up
+    question ("what about its runtime?") names no movie itself.
+    """
+    question = answer_cache.normalize(user_message)
+    intents = [name for name, pattern in INTENT_PATTERNS if pattern.search(question)]
+    playing = PLAYING_RE.search(question)
+    if not intents and not playing:
+        return None, None
+
+    movies = Movie.query.order_by(Movie.title).all()
+    movie = _find_movie(question, movies)
+    if movie is None and intents and last_movie:
+        movie = next((m for m in movies if m.title == last_movie), None)
+    if not intents:
+        # "Which movies ..." asking for something specific (a cast, a rating) is the LLM's job
+        if playing and movie is None and movies:
+            return "Now showing: " + ", ".join(m.title for m in movies) + ".", None
+        return None, movie
+    if movie is None:
+        return None, None
+    return " ".join(_describe(intent, movie) for intent in intents), movie
+
+
+def build_prompt(user_message: str, memory=None) -> str:
+    # Only the movies relevant to the question, within the prompt token budget
+    budget = retrieval.PROMPT_TOKEN_BUDGET
+    history = ""
+    query = user_message
+    if memory:
+        history = conversation.render(memory, conversation.CHAT_MEMORY_TOKEN_BUDGET, retrieval.estimate_tokens)
+        budget -= retrieval.estimate_tokens(history) if history else 0
+        if memory.last_movie:
+            query = f"{memory.last_movie} {user_message}"
+    context = retrieval.select_context(query, token_budget=budget)
+    if history:
+        history = f"Conversation so far:\n{history}\n\n"
+
+    return f"""
                 You are FlickBook's concise movie assistant.
 
                 Use ONLY the movie data provided below. 
@@ -54,23 +212,110 @@ def ask_movie_bot(user_message: str) -> str:
                 Movie Data:
                 {context}
 
-                User: {user_message}
+                {history}User: {user_message}
             """.strip()
 
-    try:
-        res = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-            },
-            timeout=60,
+
+def _plan(user_message, username):
+    """Return (quick_reply, cache_key, memory, movie_title) for a question.
+
+    Standalone questions are cached and sent without history; follow-ups
+    carry the user's conversation and skip the shared answer cache.
+    movie_title is the catalog movie the question resolved to, if any.
+    """
+    memory = conversation.load(username)
+    follow_up = bool(memory) and conversation.is_follow_up(answer_cache.normalize(user_message))
+    if not follow_up:
+        memory = None
+
+    quick, movie = answer_structured(user_message, memory.last_movie if memory else None)
+    movie_title = movie.title if movie else None
+    if quick is not None:
+        return quick, None, memory, movie_title
+    return None, (None if memory else answer_cache.key_for(user_message)), memory, movie_title
+
+
+def _remember(username, user_message, reply, memory, movie_title=None):
+    if not username:
+        return
+    if movie_title is None:
+        # Only the titles are needed to spot a movie named in the question or the reply
+        titles = db.session.query(Movie.title).all()
+        movie = _find_movie(answer_cache.normalize(user_message), titles) or _find_movie(
+            answer_cache.normalize(reply), titles
         )
-        res.raise_for_status()
-        data = res.json()
-        reply = data.get("response") or "Sorry, I couldn't generate a response."
-        return reply.strip()
+        if movie is not None:
+            movie_title = movie.title
+        elif memory:
+            # A resolved follow-up is still about the same movie
+            movie_title = memory.last_movie
+    try:
+        conversation.record(username, user_message, reply, movie_title)
+    except Exception as exc:
+        print("Could not save chat memory:", exc)
+
+
+def _answer_now(user_message, username):
+    """Return (reply, cache_key, memory, movie_title); reply is None when only the LLM can answer."""
+    reply, cache_key, memory, movie_title = _plan(user_message, username)
+    if reply is None and cache_key is not None:
+        reply = answer_cache.get(cache_key)
+    if reply is not None:
+        _remember(username, user_message, reply, memory, movie_title)
+    return reply, cache_key, memory, movie_title
+
+
+def quick_reply(user_message: str, username=None):
+    """Return (reply, plan) for a question, cheap enough for the web thread.
+
+    reply comes from the catalog or the answer cache, or is None when the
+    question needs the LLM; hand plan to stream_movie_bot then so the
+    worker does not load the memory or consult the cache a second time.
+    """
+    plan = _answer_now(user_message, username)
+    return plan[0], plan
+
+
+def stream_movie_bot(user_message: str, username=None, plan=None):
+    """Yield the reply as Ollama generates it, one text fragment at a time.
+
+    plan is the second value of quick_reply() when it already ran for this question.
+    """
+    ready, cache_key, memory, movie_title = plan or _answer_now(user_message, username)
+    if ready is not None:
+        yield ready
+        return
+
+    prompt = build_prompt(user_message, memory)
+    produced = []
+
+    try:
+        with generation_slot(), generate(prompt, stream=True) as res:
+            res.raise_for_status()
+            for line in res.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                token = chunk.get("response")
+                if token:
+                    produced.append(token)
+                    yield token
+                if chunk.get("done"):
+                    break
+    except OllamaBusy:
+        yield BUSY_REPLY
+        return
     except Exception as e:
         print("Ollama error:", e)
-        return "LLM Error."
+        if not produced:
+            yield "LLM Error."
+        return
+
+    if not produced:
+        yield "Sorry, I couldn't generate a response."
+        return
+    reply = "".join(produced).strip()
+    # Only replies that streamed to completion are worth replaying or remembering
+    if cache_key is not None:
+        answer_cache.store(cache_key, reply)
+    _remember(username, user_message, reply, memory, movie_title)
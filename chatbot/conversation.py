@@ -0,0 +1,123 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import ChatMemory, db
+
+try:
+    CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "4"))
+except ValueError:
+    CHAT_MEMORY_TURNS = 4
+try:
+    CHAT_MEMORY_TTL_SECONDS = int(os.getenv("CHAT_MEMORY_TTL_SECONDS", "1800"))
+except ValueError:
+    CHAT_MEMORY_TTL_SECONDS = 1800
+try:
+    CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "300"))
+except ValueError:
+    CHAT_MEMORY_TOKEN_BUDGET = 300
+# Per-field caps keep a single chatty turn from crowding out the rest
+MAX_QUESTION_CHARS = 300
+MAX_REPLY_CHARS = 500
+MAX_SUMMARY_CHARS = 600
+
+# Questions that lean on something said earlier: a leading "and"/"what about", "it", or "that one".
+# Bare "that", "they" or "her" turn up in standalone questions too ("movies that they re-released")
+FOLLOW_UP_RE = re.compile(
+    r"^(and|also|what about|how about)\b|\b(it|its|it s)\b|\b(this|that|the same) (one|movie|film)\b"
+)
+
+
+class Memory:
+    """A user's recent conversation: summary of older turns, recent turns, last movie discussed."""
+
+    def __init__(self, summary="", turns=None, last_movie=None):
+        self.summary = summary
+        self.turns = turns or []
+        self.last_movie = last_movie
+
+    def __bool__(self):
+        return bool(self.summary or self.turns or self.last_movie)
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3].rstrip() + "..."
+
+
+def is_follow_up(normalized_question):
+    return bool(FOLLOW_UP_RE.search(normalized_question))
+
+
+def load(username):
+    if not username:
+        return Memory()
+    row = ChatMemory.query.filter_by(username=username).first()
+    cutoff = datetime.now() - timedelta(seconds=CHAT_MEMORY_TTL_SECONDS)
+    if row is None or row.updated_at < cutoff:
+        return Memory()
+    return Memory(row.summary, json.loads(row.turns), row.last_movie)
+
+
+def _fold(summary, turn):
+    # Older turns collapse into a short running summary, oldest text dropped first
+    line = f"User asked: {_clip(turn['q'], 120)} Assistant: {_clip(turn['a'], 160)}"
+    summary = f"{summary} {line}".strip()
+    if len(summary) > MAX_SUMMARY_CHARS:
+        summary = "..." + summary[-(MAX_SUMMARY_CHARS - 3):]
+    return summary
+
+
+def record(username, question, reply, last_movie=None):
+    """Append a turn to username's memory, folding the oldest turns into the summary."""
+    if not username:
+        return
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=CHAT_MEMORY_TTL_SECONDS)
+    ChatMemory.query.filter(ChatMemory.updated_at < cutoff).delete(synchronize_session=False)
+
+    row = ChatMemory.query.filter_by(username=username).first()
+    if row is None:
+        row = ChatMemory(username=username, turns="[]", summary="")
+        db.session.add(row)
+
+    turns = json.loads(row.turns)
+    turns.append({"q": _clip(question, MAX_QUESTION_CHARS), "a": _clip(reply, MAX_REPLY_CHARS)})
+    summary = row.summary
+    while len(turns) > CHAT_MEMORY_TURNS:
+        summary = _fold(summary, turns.pop(0))
+
+    row.turns = json.dumps(turns)
+    row.summary = summary
+    if last_movie:
+        row.last_movie = last_movie
+    row.updated_at = now
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request created this user's row first; this turn is dropped
+        db.session.rollback()
+
+
+def clear(username):
+    ChatMemory.query.filter_by(username=username).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def render(memory, token_budget, estimate_tokens):
+    """Format memory for the prompt, newest turns first in priority, within token_budget."""
+    lines = []
+    remaining = token_budget
+    for turn in reversed(memory.turns):
+        line = f"User: {turn['q']}\nAssistant: {turn['a']}"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            break
+        lines.insert(0, line)
+        remaining -= cost
+    if memory.summary and estimate_tokens(memory.summary) <= remaining:
+        lines.insert(0, f"Earlier: {memory.summary}")
+    return "\n".join(lines)
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from chatbot import knowledge
+import http_client
+from models import Movie, MovieEmbedding, db
+from omdb import CircuitBreaker, LRUCache
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+SEMANTIC_SEARCH = os.getenv("SEMANTIC_SEARCH", "1") != "0"
+try:
+    EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "30"))
+except ValueError:
+    EMBED_TIMEOUT = 30.0
+try:
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+except ValueError:
+    EMBED_BATCH_SIZE = 32
+
+
+class EmbeddingsUnavailable(Exception):
+    pass
+
+
+# One failure is enough to stop trying for a while; callers fall back to keyword search
+breaker = CircuitBreaker(failure_threshold=1, slow_seconds=EMBED_TIMEOUT, reset_seconds=60)
+_query_vectors = LRUCache(500)
+
+# (version, [(imdb_id, title)], unit-length float32 matrix) loaded for this process
+_index = (None, [], None)
+_index_lock = threading.Lock()
+
+
+def embedding_text(movie):
+    parts = [
+        f"Title: {movie.title}",
+        f"Genre: {movie.genre or ''}",
+        f"Director: {movie.director or ''}",
+        f"Actors: {movie.actors or ''}",
+        f"Plot: {movie.plot or ''}",
+    ]
+    return ". ".join(parts)
+
+
+def content_hash(text):
+    return hashlib.sha1(f"{OLLAMA_EMBED_MODEL}\n{text}".encode()).hexdigest()
+
+
+def embed(texts):
+    """Return a float32 matrix with one embedding row per text."""
+    if not SEMANTIC_SEARCH or not breaker.allow():
+        raise EmbeddingsUnavailable()
+    started = time.monotonic()
+    try:
+        # /api/embed takes a batch of inputs in one call
+        res = http_client.post(
+            f"{OLLAMA_URL}/api/embed",
+            json={"model": OLLAMA_EMBED_MODEL, "input": list(texts)},
+            timeout=(http_client.HTTP_CONNECT_TIMEOUT, EMBED_TIMEOUT),
+        )
+        res.raise_for_status()
+        vectors = np.asarray(res.json()["embeddings"], dtype=np.float32)
+    except Exception as exc:
+        breaker.record_failure()
+        print("Embedding request failed:", exc)
+        raise EmbeddingsUnavailable() from exc
+    breaker.record_success(time.monotonic() - started)
+    if vectors.shape[0] != len(texts):
+        raise EmbeddingsUnavailable()
+    return vectors
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def sync_embeddings():
+    """Embed movies whose metadata changed since their vector was stored. Returns the count embedded."""
+    movies = Movie.query.all()
+    stored = {e.imdb_id: e for e in MovieEmbedding.query.all()}
+    current = {m.imdb_id for m in movies}
+
+    for imdb_id, entry in stored.items():
+        if imdb_id not in current:
+            db.session.delete(entry)
+
+    pending = []
+    for movie in movies:
+        text = embedding_text(movie)
+        digest = content_hash(text)
+        entry = stored.get(movie.imdb_id)
+        if entry is None or entry.content_hash != digest:
+            pending.append((movie, text, digest))
+
+    now = datetime.now()
+    for start in range(0, len(pending), EMBED_BATCH_SIZE):
+        batch = pending[start:start + EMBED_BATCH_SIZE]
+        vectors = embed([text for _, text, _ in batch])
+        for (movie, _, digest), vector in zip(batch, vectors):
+            entry = stored.get(movie.imdb_id) or MovieEmbedding(imdb_id=movie.imdb_id)
+            entry.model = OLLAMA_EMBED_MODEL
+            entry.content_hash = digest
+            entry.dimensions = vector.shape[0]
+            entry.vector = vector.tobytes()
+            entry.updated_at = now
+            db.session.add(entry)
+    db.session.commit()
+    return len(pending)
+
+
+def _load_index(version):
+    global _index
+    cached_version, movies, matrix = _index
+    if cached_version == version:
+        return movies, matrix
+    with _index_lock:
+        if _index[0] == version:
+            return _index[1], _index[2]
+        try:
+            sync_embeddings()
+        except EmbeddingsUnavailable:
+            db.session.rollback()
+            raise
+        rows = (
+            db.session.query(MovieEmbedding, Movie.title)
+            .join(Movie, Movie.imdb_id == MovieEmbedding.imdb_id)
+            .filter(MovieEmbedding.model == OLLAMA_EMBED_MODEL)
+            .order_by(MovieEmbedding.imdb_id)
+            .all()
+        )
+        movies = [(entry.imdb_id, title) for entry, title in rows]
+        matrix = None
+        if rows:
+            matrix = _normalize(np.vstack([np.frombuffer(entry.vector, dtype=np.float32) for entry, _ in rows]))
+        _index = (version, movies, matrix)
+    return movies, matrix
+
+
+def _query_vector(query):
+    key = " ".join(query.lower().split())
+    vector = _query_vectors.get(key)
+    if vector is None:
+        vector = _normalize(embed([query])[0])
+        _query_vectors.set(key, vector, datetime.now() + timedelta(hours=1))
+    return vector
+
+
+def search(query, k=5, like=None):
+    """Return [(imdb_id, title, score)] for the k movies closest to query, or to movie `like`.
+
+    Raises EmbeddingsUnavailable when vectors cannot be computed.
+    """
+    if not SEMANTIC_SEARCH:
+        raise EmbeddingsUnavailable()
+    movies, matrix = _load_index(knowledge.current_version())
+    if matrix is None or k <= 0:
+        return []
+
+    exclude = None
+    if like is not None:
+        positions = [i for i, (imdb_id, _) in enumerate(movies) if imdb_id == like]
+        if not positions:
+            return []
+        exclude = positions[0]
+        vector = matrix[exclude]
+    else:
+        vector = _query_vector(query)
+    if vector.shape[0] != matrix.shape[1]:
+        raise EmbeddingsUnavailable()
+
+    # Rows are unit length, so the dot product is the cosine similarity
+    scores = matrix @ vector
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    k = min(k, len(movies) - (1 if exclude is not None else 0))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(movies[i][0], movies[i][1], float(scores[i])) for i in top]
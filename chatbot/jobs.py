@@ -0,0 +1,224 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from chatbot.chatbot_logic import stream_movie_bot
+from models import ChatJob, db
+
+try:
+    CHAT_JOB_WORKERS = int(os.getenv("CHAT_JOB_WORKERS", "2"))
+except ValueError:
+    CHAT_JOB_WORKERS = 2
+try:
+    CHAT_JOB_QUEUE_SIZE = int(os.getenv("CHAT_JOB_QUEUE_SIZE", "16"))
+except ValueError:
+    CHAT_JOB_QUEUE_SIZE = 16
+try:
+    CHAT_JOB_TTL_SECONDS = int(os.getenv("CHAT_JOB_TTL_SECONDS", "3600"))
+except ValueError:
+    CHAT_JOB_TTL_SECONDS = 3600
+# How often a running job saves its partial reply, and how often followers in other processes look for it
+CHAT_JOB_FLUSH_SECONDS = 0.25
+CHAT_JOB_POLL_SECONDS = 0.2
+
+FINISHED = ("done", "error")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Channel:
+    """Tokens of a job queued in this process, handed to local followers as they are produced."""
+
+    def __init__(self, plan=None):
+        self.plan = plan
+        self.parts = []
+        self.done = False
+        self.changed = threading.Condition()
+
+    def publish(self, token=None, done=False):
+        with self.changed:
+            if token:
+                self.parts.append(token)
+            self.done = self.done or done
+            self.changed.notify_all()
+
+
+_queue = queue.Queue(maxsize=CHAT_JOB_QUEUE_SIZE)
+_workers = []
+_workers_lock = threading.Lock()
+# Jobs queued or running in this process; the ChatJob row only serves followers elsewhere
+_channels = {}
+
+
+def _run_job(job_id):
+    channel = _channels.get(job_id) or _Channel()
+    try:
+        _generate(job_id, channel)
+    finally:
+        channel.publish(done=True)
+        _channels.pop(job_id, None)
+
+
+def _generate(job_id, channel):
+    job = db.session.get(ChatJob, job_id)
+    if job is None:
+        return
+    job.status = "running"
+    job.updated_at = datetime.now()
+    db.session.commit()
+
+    parts = []
+    last_flush = time.monotonic()
+    try:
+        for token in stream_movie_bot(job.message, job.username, channel.plan):
+            parts.append(token)
+            channel.publish(token)
+            if time.monotonic() - last_flush >= CHAT_JOB_FLUSH_SECONDS:
+                job.reply = "".join(parts)
+                job.updated_at = datetime.now()
+                db.session.commit()
+                last_flush = time.monotonic()
+        job.reply = "".join(parts)
+        job.status = "done"
+    except Exception as exc:
+        print("Chat job failed:", exc)
+        db.session.rollback()
+        job = db.session.get(ChatJob, job_id)
+        job.reply = "LLM Error."
+        job.status = "error"
+        if not parts:
+            channel.publish(job.reply)
+    # Local followers have the whole reply already; only other processes wait for the row
+    channel.publish(done=True)
+    job.updated_at = datetime.now()
+    db.session.commit()
+
+
+def _worker_loop(app):
+    while True:
+        job_id = _queue.get()
+        try:
+            with app.app_context():
+                _run_job(job_id)
+        except Exception as exc:
+            print("Chat worker error:", exc)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers(app):
+    with _workers_lock:
+        while len(_workers) < CHAT_JOB_WORKERS:
+            worker = threading.Thread(
+                target=_worker_loop, args=(app,), daemon=True, name=f"chat-job-{len(_workers)}"
+            )
+            worker.start()
+            _workers.append(worker)
+
+
+def _purge_expired():
+    cutoff = datetime.now() - timedelta(seconds=CHAT_JOB_TTL_SECONDS)
+    ChatJob.query.filter(ChatJob.updated_at < cutoff).delete(synchronize_session=False)
+
+
+def submit(username, message, plan=None):
+    """Queue a chat request and return its job id; raises QueueFull when saturated.
+
+    plan is what quick_reply() worked out on the web thread, reused by the worker.
+    """
+    _ensure_workers(current_app._get_current_object())
+
+    now = datetime.now()
+    job = ChatJob(
+        id=uuid.uuid4().hex, username=username, message=message,
+        status="queued", reply="", created_at=now, updated_at=now,
+    )
+    _purge_expired()
+    db.session.add(job)
+    db.session.commit()
+
+    _channels[job.id] = _Channel(plan)
+    try:
+        _queue.put_nowait(job.id)
+    except queue.Full:
+        _channels.pop(job.id, None)
+        db.session.delete(job)
+        db.session.commit()
+        raise QueueFull()
+    return job.id
+
+
+def get_job(job_id):
+    # Rows are updated by worker threads, so always read the latest committed state
+    db.session.expire_all()
+    return db.session.get(ChatJob, job_id)
+
+
+def current_reply(job):
+    """The reply so far: straight from the worker when the job runs in this process."""
+    channel = _channels.get(job.id)
+    if channel is None:
+        return job.reply
+    with channel.changed:
+        return "".join(channel.parts)
+
+
+def _follow_channel(channel, timeout):
+    sent = 0
+    deadline = time.monotonic() + timeout
+    while True:
+        with channel.changed:
+            channel.changed.wait_for(
+                lambda: len(channel.parts) > sent or channel.done,
+                timeout=max(0.0, deadline - time.monotonic()),
+            )
+            fresh = channel.parts[sent:]
+            done = channel.done
+        if fresh:
+            sent += len(fresh)
+            yield "".join(fresh)
+        if done:
+            return
+        if time.monotonic() >= deadline:
+            yield " (timed out)"
+            return
+
+
+def follow(job_id, timeout):
+    """Yield new reply text for job_id as it is published, until the job finishes.
+
+    Jobs running in this process are followed token by token in memory;
+    anything else is polled from its ChatJob row.
+    """
+    channel = _channels.get(job_id)
+    if channel is not None:
+        yield from _follow_channel(channel, timeout)
+        return
+
+    sent = 0
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            return
+        if len(job.reply) > sent:
+            yield job.reply[sent:]
+            sent = len(job.reply)
+        if job.status in FINISHED:
+            return
+        if time.monotonic() >= deadline:
+            yield " (timed out)"
+            return
+        db.session.rollback()
+        time.sleep(CHAT_JOB_POLL_SECONDS)
+
+
+def stats():
+    return {"queued": _queue.qsize(), "capacity": CHAT_JOB_QUEUE_SIZE, "workers": len(_workers)}
@@ -0,0 +1,184 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import CatalogState, KnowledgeEntry, Movie, db
+import omdb
+
+try:
+    KNOWLEDGE_WORKERS = int(os.getenv("KNOWLEDGE_WORKERS", "8"))
+except ValueError:
+    KNOWLEDGE_WORKERS = 8
+try:
+    KNOWLEDGE_DEADLINE_SECONDS = float(os.getenv("KNOWLEDGE_DEADLINE_SECONDS", "3"))
+except ValueError:
+    KNOWLEDGE_DEADLINE_SECONDS = 3.0
+try:
+    KNOWLEDGE_TTL_SECONDS = int(os.getenv("KNOWLEDGE_TTL_SECONDS", "86400"))
+except ValueError:
+    KNOWLEDGE_TTL_SECONDS = 86400
+# Degraded summaries are retried much sooner than complete ones
+KNOWLEDGE_RETRY_SECONDS = 300
+
+NO_MOVIES = "No movies available."
+
+# Shared across requests so concurrent chats cannot multiply outbound OMDB calls
+_knowledge_pool = ThreadPoolExecutor(max_workers=KNOWLEDGE_WORKERS, thread_name_prefix="omdb-fanout")
+
+# (version, snapshot, earliest expiry) materialized for this process
+_corpus = (None, None, None)
+_corpus_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def _limited_summary(title):
+    return f"Title: {title}. Limited info available."
+
+
+def _fetch_details(app, imdb_id):
+    # Runs on a pool thread, so it needs its own app context for the OMDB cache
+    with app.app_context():
+        return omdb.get_movie(imdb_id, plot="full")
+
+
+def movie_summary(movie):
+    return (
+        f"Title: {movie.title}. Genre: {movie.genre or 'Unknown genre'}. "
+        f"Actors: {movie.actors or 'Unknown actors'}. Rating: {movie.rating or 'N/A'}. "
+        f"Plot: {movie.plot or 'No plot available'}"
+    )
+
+
+def build_summaries(movies):
+    """Return {imdb_id: (summary, complete)} for movies.
+
+    Movies with stored details are summarized straight from the database;
+    only those never fetched hit OMDB, concurrently and under a deadline.
+    """
+    missing = [m for m in movies if m.refreshed_at is None]
+    if missing:
+        app = current_app._get_current_object()
+        futures = [_knowledge_pool.submit(_fetch_details, app, m.imdb_id) for m in missing]
+        wait(futures, timeout=KNOWLEDGE_DEADLINE_SECONDS)
+
+        for m, future in zip(missing, futures):
+            if not future.done():
+                # Missed the deadline; the fetch keeps warming the cache in the background
+                continue
+            try:
+                omdb.apply_details(m, future.result())
+            except Exception as e:
+                print("Error occured:", e)
+        db.session.commit()
+
+    summaries = {}
+    for m in movies:
+        if m.refreshed_at is None:
+            summaries[m.imdb_id] = (_limited_summary(m.title), False)
+        else:
+            summaries[m.imdb_id] = (movie_summary(m), True)
+    return summaries
+
+
+def current_version():
+    state = db.session.get(CatalogState, 1)
+    return state.version if state else 0
+
+
+def bump_version():
+    # Single UPDATE so concurrent writers on other workers never lose an increment
+    updated = db.session.execute(
+        db.update(CatalogState)
+        .where(CatalogState.id == 1)
+        .values(version=CatalogState.version + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(CatalogState(id=1, version=1))
+    db.session.commit()
+
+
+def sync_knowledge():
+    """Bring the stored corpus in line with the catalog, touching only changed movies.
+
+    Returns True when the corpus changed and the catalog version was bumped.
+    """
+    movies = {m.imdb_id: m for m in Movie.query.all()}
+    entries = {e.imdb_id: e for e in KnowledgeEntry.query.all()}
+    now = datetime.now()
+
+    removed = [e for imdb_id, e in entries.items() if imdb_id not in movies]
+    stale = [
+        m for imdb_id, m in movies.items()
+        if imdb_id not in entries or entries[imdb_id].expires_at <= now
+    ]
+    if not removed and not stale and current_version() > 0:
+        return False
+
+    summaries = build_summaries(stale) if stale else {}
+    try:
+        for entry in removed:
+            db.session.delete(entry)
+        for m in stale:
+            summary, complete = summaries[m.imdb_id]
+            entry = entries.get(m.imdb_id) or KnowledgeEntry(imdb_id=m.imdb_id)
+            entry.title = m.title
+            entry.summary = summary
+            entry.built_at = now
+            ttl = KNOWLEDGE_TTL_SECONDS if complete else KNOWLEDGE_RETRY_SECONDS
+            entry.expires_at = now + timedelta(seconds=ttl)
+            db.session.add(entry)
+        db.session.flush()
+        bump_version()
+    except IntegrityError:
+        # Another worker synced the same movies first; its version bump covers us
+        db.session.rollback()
+        return False
+    return True
+
+
+def _refresh_in_background(app):
+    try:
+        with app.app_context():
+            sync_knowledge()
+    except Exception as exc:
+        print("Knowledge refresh failed:", exc)
+    finally:
+        _refresh_lock.release()
+
+
+def get_snapshot():
+    """Return (version, [(title, summary), ...], corpus) for the current catalog version.
+
+    Normally a single-row version read; the stored summaries are only
+    reloaded when another process has bumped the version.
+    """
+    global _corpus
+    version = current_version()
+    if version == 0:
+        # First chat against a never-synced catalog builds the corpus once
+        sync_knowledge()
+        version = current_version()
+
+    cached_version, snapshot, next_expiry = _corpus
+    if cached_version != version:
+        with _corpus_lock:
+            rows = KnowledgeEntry.query.order_by(KnowledgeEntry.title.asc()).all()
+            entries = [(e.title, e.summary) for e in rows]
+            corpus = "\n".join(summary for _, summary in entries) or NO_MOVIES
+            snapshot = (version, entries, corpus)
+            next_expiry = min((e.expires_at for e in rows), default=None)
+            _corpus = (version, snapshot, next_expiry)
+
+    if next_expiry and next_expiry <= datetime.now() and _refresh_lock.acquire(blocking=False):
+        # Expired summaries are rebuilt off the request; this chat still gets the old text
+        threading.Thread(
+            target=_refresh_in_background,
+            args=(current_app._get_current_object(),),
+            daemon=True,
+        ).start()
+    return snapshot
+
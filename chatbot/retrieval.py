@@ -0,0 +1,153 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from chatbot import embeddings, knowledge
+from models import Movie
+
+try:
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+except ValueError:
+    RETRIEVAL_TOP_K = 5
+try:
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+except ValueError:
+    PROMPT_TOKEN_BUDGET = 1200
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "at", "be", "by", "can", "do", "does",
+    "for", "from", "good", "how", "i", "in", "is", "it", "me", "movie", "movies",
+    "of", "on", "or", "playing", "show", "showing", "some", "tell", "that", "the",
+    "there", "this", "to", "want", "was", "what", "whats", "which", "who", "with",
+    "you",
+    # Field labels present in every summary line
+    "actors", "genre", "plot", "rating", "title",
+}
+
+# (version, index) built for this process
+_index = (None, None)
+_index_lock = threading.Lock()
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    # Close enough to the model tokenizer for budgeting English prose
+    return max(1, len(text) // 4)
+
+
+class BM25Index:
+    """Okapi BM25 over short movie documents."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for doc_id, text in enumerate(documents):
+            terms = Counter(tokenize(text))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((doc_id, tf))
+        count = len(self.lengths)
+        self.avg_length = (sum(self.lengths) / count) if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, k):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def _get_index(version, entries):
+    global _index
+    cached_version, index = _index
+    if cached_version == version:
+        return index
+    with _index_lock:
+        # Titles are repeated so a title match outranks a passing mention in a plot
+        index = BM25Index([f"{title} {title} {summary}" for title, summary in entries])
+        _index = (version, index)
+    return index
+
+
+def keyword_search(query, k, like=None):
+    """BM25 fallback for catalog search. Returns [(imdb_id, score)]."""
+    movies = Movie.query.order_by(Movie.title).all()
+    if like is not None:
+        source = next((m for m in movies if m.imdb_id == like), None)
+        if source is None:
+            return []
+        query = embeddings.embedding_text(source)
+        movies = [m for m in movies if m.imdb_id != like]
+    index = BM25Index([embeddings.embedding_text(m) for m in movies])
+    return [(movies[doc_id].imdb_id, score) for doc_id, score in index.search(query, k)]
+
+
+def rank(question, version, entries, top_k):
+    """Return entry positions most relevant to question: semantic when available, else BM25."""
+    try:
+        positions = {title: i for i, (title, _) in enumerate(entries)}
+        ranked = [positions[title] for _, title, _ in embeddings.search(question, top_k) if title in positions]
+        if ranked:
+            return ranked
+    except embeddings.EmbeddingsUnavailable:
+        pass
+    return [doc_id for doc_id, _ in _get_index(version, entries).search(question, top_k)]
+
+
+def select_context(question, top_k=None, token_budget=None):
+    """Return the movie context for question, sized to fit token_budget.
+
+    A compact list of every title comes first so "what's playing" style
+    questions still work, followed by the full summaries of the top_k
+    movies ranked most relevant, for as long as the budget lasts.
+    """
+    top_k = RETRIEVAL_TOP_K if top_k is None else top_k
+    token_budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+
+    version, entries, corpus = knowledge.get_snapshot()
+    if not entries:
+        return corpus
+    if len(entries) <= top_k and estimate_tokens(corpus) <= token_budget:
+        return corpus
+
+    lines = []
+    remaining = token_budget
+
+    # The title list may use at most a quarter of the budget
+    titles = []
+    title_budget = token_budget // 4
+    for title, _ in entries:
+        cost = estimate_tokens(title) + 1
+        if cost > title_budget:
+            break
+        titles.append(title)
+        title_budget -= cost
+        remaining -= cost
+    if titles:
+        lines.append("Now showing: " + "; ".join(titles))
+
+    for doc_id in rank(question, version, entries, top_k):
+        summary = entries[doc_id][1]
+        cost = estimate_tokens(summary)
+        if cost > remaining:
+            continue
+        lines.append(summary)
+        remaining -= cost
+
+    return "\n".join(lines)
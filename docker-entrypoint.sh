@@ -14,9 +14,16 @@ done
 
 # Pull the desired model (cached inside the image)
 ollama pull "${OLLAMA_MODEL:-llama3}"
+# Embedding model for semantic movie search (search falls back to keywords without it)
+ollama pull "${OLLAMA_EMBED_MODEL:-nomic-embed-text}" || true
 
 # Seed the application data
 python seed.py
 
-# Launch the Flask app via gunicorn
-exec gunicorn -b 0.0.0.0:5000 app:app
+# Launch the Flask app via gunicorn. Threaded workers keep chat streams from
+# tying up whole processes; the LLM itself runs on the chat job pool.
+exec gunicorn -b 0.0.0.0:5000 \
+  --workers "${GUNICORN_WORKERS:-2}" \
+  --threads "${GUNICORN_THREADS:-8}" \
+  --timeout "${GUNICORN_TIMEOUT:-90}" \
+  app:app
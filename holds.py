@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from models import SeatHold, Showtime, db
+import showtimes
+
+try:
+    SEAT_HOLD_TTL_SECONDS = int(os.getenv("SEAT_HOLD_TTL_SECONDS", "1800"))
+except ValueError:
+    SEAT_HOLD_TTL_SECONDS = 1800
+try:
+    # How long a hold outlives its Stripe session, so a buyer never pays for seats already given back
+    SEAT_HOLD_GRACE_SECONDS = int(os.getenv("SEAT_HOLD_GRACE_SECONDS", "300"))
+except ValueError:
+    SEAT_HOLD_GRACE_SECONDS = 300
+try:
+    SEAT_HOLD_SWEEP_SECONDS = int(os.getenv("SEAT_HOLD_SWEEP_SECONDS", "60"))
+except ValueError:
+    SEAT_HOLD_SWEEP_SECONDS = 60
+# Stripe refuses checkout sessions that expire sooner than 30 minutes after creation
+STRIPE_MIN_SESSION_SECONDS = 31 * 60
+
+
+def checkout_window(now=None):
+    """Return (session_expires_at, hold_expires_at) for a checkout starting now.
+
+    The hold lasts SEAT_HOLD_GRACE_SECONDS past the Stripe session, so the
+    sweeper cannot release seats that the buyer can still pay for.
+    """
+    now = now or datetime.now()
+    session_expires_at = now + timedelta(seconds=max(SEAT_HOLD_TTL_SECONDS, STRIPE_MIN_SESSION_SECONDS))
+    return session_expires_at, session_expires_at + timedelta(seconds=SEAT_HOLD_GRACE_SECONDS)
+
+
+def create(row, quantity, username, expires_at=None):
+    """Take quantity seats from showing row into a new hold and commit; raises SoldOut."""
+    now = datetime.now()
+    hold = SeatHold(
+        showtime_id=row.id, quantity=quantity, username=username, status="held",
+        created_at=now, expires_at=expires_at or now + timedelta(seconds=SEAT_HOLD_TTL_SECONDS),
+    )
+    try:
+        showtimes.reserve(row, quantity)
+        db.session.add(hold)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return hold
+
+
+def attach_session(hold, checkout_session_id):
+    hold.checkout_session_id = checkout_session_id
+    db.session.commit()
+
+
+def lookup(checkout_session_id=None, hold_id=None):
+    """Find the hold for a Stripe checkout session, falling back to the id in its metadata."""
+    db.session.expire_all()
+    hold = None
+    if checkout_session_id:
+        hold = SeatHold.query.filter_by(checkout_session_id=checkout_session_id).first()
+    if hold is None and hold_id:
+        try:
+            hold = db.session.get(SeatHold, int(hold_id))
+        except (TypeError, ValueError):
+            hold = None
+    return hold
+
+
+def _transition(hold, status):
+    # Only one caller (success page, webhook, cancel, sweeper) wins a given hold
+    result = db.session.execute(
+        db.update(SeatHold)
+        .where(SeatHold.id == hold.id, SeatHold.status == "held")
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(hold, ["status"])
+    return result.rowcount == 1
+
+
+def convert(hold):
+    """Claim a held hold's seats for a booking (caller commits). False if it was already settled."""
+    return _transition(hold, "converted")
+
+
+def release(hold):
+    """Give a held hold's seats back to its showing (caller commits). False if it was already settled."""
+    if not _transition(hold, "released"):
+        return False
+    row = db.session.get(Showtime, hold.showtime_id)
+    if row is not None:
+        showtimes.release(row, hold.quantity)
+    return True
+
+
+def release_expired(now=None):
+    """Release every hold past its expiry. Returns the count released."""
+    now = now or datetime.now()
+    expired = (
+        SeatHold.query.filter(SeatHold.status == "held", SeatHold.expires_at < now)
+        .order_by(SeatHold.expires_at)
+        .all()
+    )
+    released = 0
+    for hold in expired:
+        try:
+            if release(hold):
+                released += 1
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            print(f"Could not release seat hold {hold.id}:", exc)
+    return released
+
+
+def _sweep_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                count = release_expired()
+            if count:
+                print(f"Released {count} expired seat hold(s)")
+        except Exception as exc:
+            print("Seat hold sweep failed:", exc)
+
+
+def start_sweeper(app, interval=None):
+    interval = SEAT_HOLD_SWEEP_SECONDS if interval is None else interval
+    if interval <= 0:
+        return None
+    worker = threading.Thread(target=_sweep_loop, args=(app, interval), daemon=True, name="seat-hold-sweeper")
+    worker.start()
+    return worker
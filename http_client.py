@@ -0,0 +1,100 @@
+import os
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+HTTP_CONNECT_TIMEOUT = _env_number("HTTP_CONNECT_TIMEOUT", 3.05)
+HTTP_READ_TIMEOUT = _env_number("HTTP_READ_TIMEOUT", 10.0)
+HTTP_MAX_RETRIES = _env_number("HTTP_MAX_RETRIES", 2, int)
+HTTP_BACKOFF_SECONDS = _env_number("HTTP_BACKOFF_SECONDS", 0.25)
+# Number of per-host pools kept alive, and connections kept per host
+HTTP_POOL_HOSTS = _env_number("HTTP_POOL_HOSTS", 10, int)
+HTTP_POOL_SIZE = _env_number("HTTP_POOL_SIZE", 20, int)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+_timing_hooks = []
+
+
+def _build_session():
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    return http
+
+
+session = _build_session()
+
+
+def add_timing_hook(hook):
+    """Register hook(method, url, elapsed_seconds, status_code, error) for every attempt."""
+    _timing_hooks.append(hook)
+
+
+def remove_timing_hook(hook):
+    if hook in _timing_hooks:
+        _timing_hooks.remove(hook)
+
+
+def _emit_timing(method, url, elapsed, status_code, error):
+    for hook in list(_timing_hooks):
+        try:
+            hook(method, url, elapsed, status_code, error)
+        except Exception as exc:
+            print("HTTP timing hook failed:", exc)
+
+
+def _backoff(attempt):
+    # Full jitter keeps retrying workers from hitting the upstream in lockstep
+    return random.uniform(0, HTTP_BACKOFF_SECONDS * (2 ** attempt))
+
+
+def request(method, url, timeout=None, retries=None, **kwargs):
+    """Send a request over the shared keep-alive session with bounded retries.
+
+    Only idempotent methods are retried by default. Connection errors,
+    timeouts and RETRY_STATUSES responses are retried; anything else is
+    returned to the caller as-is.
+    """
+    method = method.upper()
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    if retries is None:
+        retries = HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+    hook_url = url.split("?", 1)[0]
+
+    for attempt in range(retries + 1):
+        is_last = attempt == retries
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            _emit_timing(method, hook_url, time.perf_counter() - start, None, exc)
+            if is_last:
+                raise
+        else:
+            _emit_timing(method, hook_url, time.perf_counter() - start, response.status_code, None)
+            if is_last or response.status_code not in RETRY_STATUSES:
+                return response
+            response.close()
+        time.sleep(_backoff(attempt))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
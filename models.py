@@ -1,8 +1,16 @@
+from datetime import datetime, timezone
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 
 db = SQLAlchemy()
 
 
+def utcnow():
+    # Naive UTC, matching what CURRENT_TIMESTAMP server defaults store
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -14,20 +22,172 @@ class User(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'movie_bookings'
+    __table_args__ = (
+        # "my bookings" and user deletion filter by user, newest first
+        db.Index('ix_movie_bookings_user_created', 'user_id', 'created_at'),
+        db.Index('ix_movie_bookings_movie_date', 'movie_id', 'show_date'),
+        # Keyset pagination order for the admin list
+        db.Index('ix_movie_bookings_created_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
+    # Title and username are kept for display and for bookings outside the catalog or user table;
+    # the ids are filled in on insert (see _link_booking)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='SET NULL'))
     movie_title = db.Column(db.String(255), nullable=False)
-    show_date = db.Column(db.String(50), nullable=False)
+    show_date = db.Column(db.Date, nullable=False)
     showtime = db.Column(db.String(50), nullable=False)
     showtime_available = db.Column(db.Integer)
     quantity = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     booked_by = db.Column(db.String(50), nullable=False)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # Set in Python so every row has the same sub-second format, which keyset cursors compare against
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow, server_default=db.func.now())
+    # Relationships also make a flush insert new movies and users before the bookings that name them
+    movie = db.relationship('Movie')
+    user = db.relationship('User')
+    # Dedupe keys: client Idempotency-Key for direct bookings, Stripe session for paid ones
+    idempotency_key = db.Column(db.String(100), unique=True, index=True)
+    checkout_session_id = db.Column(db.String(255), unique=True, index=True)
+
+    @validates('show_date')
+    def _coerce_show_date(self, key, value):
+        # The API speaks YYYY-MM-DD strings; raises ValueError for anything else
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        if isinstance(value, datetime):
+            return value.date()
+        return value
 
 class Movie(db.Model):
     __tablename__ = 'movies'
     id = db.Column(db.Integer, primary_key=True)
     imdb_id = db.Column(db.String(20), unique=True, nullable=False)
-    title = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(200), nullable=False, index=True)
     year = db.Column(db.String(10), nullable=False)
     poster = db.Column(db.String(300), nullable=False)
     expiration = db.Column(db.Date, nullable=True)
+    # Full OMDB detail record, captured at add time and refreshed in the background
+    director = db.Column(db.String(255))
+    production = db.Column(db.String(255))
+    genre = db.Column(db.String(255))
+    rating = db.Column(db.String(10))
+    runtime = db.Column(db.String(50))
+    actors = db.Column(db.String(500))
+    plot = db.Column(db.Text)
+    released = db.Column(db.String(50))
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+
+
+class OmdbCacheEntry(db.Model):
+    __tablename__ = 'omdb_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(255), unique=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class CatalogState(db.Model):
+    __tablename__ = 'catalog_state'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+
+class KnowledgeEntry(db.Model):
+    __tablename__ = 'chatbot_knowledge'
+    id = db.Column(db.Integer, primary_key=True)
+    imdb_id = db.Column(db.String(20), unique=True, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    built_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ChatJob(db.Model):
+    __tablename__ = 'chat_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    username = db.Column(db.String(50), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    reply = db.Column(db.Text, nullable=False, default='')
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ChatMemory(db.Model):
+    __tablename__ = 'chat_memory'
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), unique=True, nullable=False)
+    # JSON list of the most recent {"q": ..., "a": ...} turns
+    turns = db.Column(db.Text, nullable=False, default='[]')
+    summary = db.Column(db.Text, nullable=False, default='')
+    last_movie = db.Column(db.String(200))
+    updated_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class MovieEmbedding(db.Model):
+    __tablename__ = 'movie_embeddings'
+    id = db.Column(db.Integer, primary_key=True)
+    imdb_id = db.Column(db.String(20), unique=True, nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    # sha1 of the model and embedded text; the vector is recomputed only when it changes
+    content_hash = db.Column(db.String(40), nullable=False)
+    dimensions = db.Column(db.Integer, nullable=False)
+    vector = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class Showtime(db.Model):
+    __tablename__ = 'showtimes'
+    __table_args__ = (
+        db.UniqueConstraint('movie_id', 'show_date', 'show_time', name='uq_showtime_slot'),
+        db.CheckConstraint('remaining >= 0 AND remaining <= capacity', name='ck_showtime_remaining'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), nullable=False)
+    show_date = db.Column(db.Date, nullable=False)
+    show_time = db.Column(db.String(20), nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    remaining = db.Column(db.Integer, nullable=False)
+
+
+class SeatHold(db.Model):
+    __tablename__ = 'seat_holds'
+    __table_args__ = (
+        # The sweeper scans active holds by expiry
+        db.Index('ix_seat_holds_status_expires', 'status', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    showtime_id = db.Column(db.Integer, db.ForeignKey('showtimes.id', ondelete='CASCADE'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    username = db.Column(db.String(50), nullable=False)
+    checkout_session_id = db.Column(db.String(255), unique=True)
+    # held -> converted (paid) or released (cancelled/expired)
+    status = db.Column(db.String(20), nullable=False, default='held')
+    booking_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+@db.event.listens_for(Booking, 'before_insert')
+def _link_booking(mapper, connection, target):
+    # Resolve the catalog movie and account on the flush connection, so rows added in the same flush count
+    if target.movie_id is None:
+        target.movie_id = connection.execute(
+            db.select(Movie.id).where(Movie.title == target.movie_title).limit(1)
+        ).scalar()
+    if target.user_id is None:
+        target.user_id = connection.execute(
+            db.select(User.id).where(User.username == target.booked_by)
+        ).scalar()
+
+
+@db.event.listens_for(User, 'after_insert')
+def _claim_bookings(mapper, connection, target):
+    # Bookings made for this username before the account existed belong to it from now on
+    connection.execute(
+        db.update(Booking)
+        .where(Booking.booked_by == target.username, Booking.user_id.is_(None))
+        .values(user_id=target.id)
+    )
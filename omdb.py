@@ -0,0 +1,491 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import http_client
+from flask import current_app
+
+from models import OmdbCacheEntry, db
+
+OMDB_API_KEY = os.getenv("OMDB_API_KEY") or "225f5d3d"
+# Point at perf/omdb_standin.py (or any compatible server) to run without the real API
+OMDB_URL = os.getenv("OMDB_URL") or "http://www.omdbapi.com/"
+
+try:
+    OMDB_CACHE_TTL_SECONDS = int(os.getenv("OMDB_CACHE_TTL_SECONDS", "86400"))
+except ValueError:
+    OMDB_CACHE_TTL_SECONDS = 86400
+try:
+    OMDB_CACHE_MAX_MEMORY = int(os.getenv("OMDB_CACHE_MAX_MEMORY", "512"))
+except ValueError:
+    OMDB_CACHE_MAX_MEMORY = 512
+try:
+    # "Movie not found!" and other error payloads are only remembered this long, in memory
+    OMDB_NEGATIVE_TTL_SECONDS = int(os.getenv("OMDB_NEGATIVE_TTL_SECONDS", "300"))
+except ValueError:
+    OMDB_NEGATIVE_TTL_SECONDS = 300
+try:
+    OMDB_SEARCH_TTL_SECONDS = int(os.getenv("OMDB_SEARCH_TTL_SECONDS", "120"))
+except ValueError:
+    OMDB_SEARCH_TTL_SECONDS = 120
+try:
+    OMDB_CACHE_MAX_ROWS = int(os.getenv("OMDB_CACHE_MAX_ROWS", "5000"))
+except ValueError:
+    OMDB_CACHE_MAX_ROWS = 5000
+try:
+    # The database tier is trimmed back to OMDB_CACHE_MAX_ROWS once every this many writes
+    OMDB_CACHE_EVICT_EVERY = max(1, int(os.getenv("OMDB_CACHE_EVICT_EVERY", "50")))
+except ValueError:
+    OMDB_CACHE_EVICT_EVERY = 50
+try:
+    OMDB_BREAKER_FAILURES = int(os.getenv("OMDB_BREAKER_FAILURES", "5"))
+except ValueError:
+    OMDB_BREAKER_FAILURES = 5
+try:
+    OMDB_BREAKER_SLOW_SECONDS = float(os.getenv("OMDB_BREAKER_SLOW_SECONDS", "2.5"))
+except ValueError:
+    OMDB_BREAKER_SLOW_SECONDS = 2.5
+try:
+    OMDB_BREAKER_RESET_SECONDS = float(os.getenv("OMDB_BREAKER_RESET_SECONDS", "30"))
+except ValueError:
+    OMDB_BREAKER_RESET_SECONDS = 30.0
+
+# Set on payloads served from expired cache entries while OMDB is unavailable
+STALE_KEY = "_stale"
+
+
+class OmdbUnavailable(Exception):
+    """OMDB failed, timed out, or is being short-circuited by the breaker."""
+
+
+class CircuitOpenError(OmdbUnavailable):
+    pass
+
+
+class LRUCache:
+    """Thread-safe in-process LRU holding (value, expires_at) pairs."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= datetime.now():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker; calls slower than slow_seconds count as failures.
+
+    closed -> open after failure_threshold failures; open -> half_open after
+    reset_seconds, letting a single probe through; the probe closes or
+    re-opens it.
+    """
+
+    def __init__(self, failure_threshold, slow_seconds, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "short_circuits": 0, "stale_served": 0}
+        self._probe_in_flight = False
+        self._close_listeners = []
+        self._lock = threading.Lock()
+
+    def on_close(self, listener):
+        self._close_listeners.append(listener)
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "closed":
+                self.stats["calls"] += 1
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.stats["calls"] += 1
+                return True
+            self.stats["short_circuits"] += 1
+            return False
+
+    def record_success(self, elapsed):
+        if elapsed > self.slow_seconds:
+            with self._lock:
+                self.stats["slow_calls"] += 1
+            self.record_failure(count_stat=False)
+            return
+        with self._lock:
+            reopened = self.state != "closed"
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+        if reopened:
+            for listener in list(self._close_listeners):
+                listener()
+
+    def record_failure(self, count_stat=True):
+        with self._lock:
+            if count_stat:
+                self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": retry_in,
+                **self.stats,
+            }
+
+
+breaker = CircuitBreaker(OMDB_BREAKER_FAILURES, OMDB_BREAKER_SLOW_SECONDS, OMDB_BREAKER_RESET_SECONDS)
+memory_cache = LRUCache(OMDB_CACHE_MAX_MEMORY)
+search_cache = LRUCache(OMDB_CACHE_MAX_MEMORY)
+_cache_writes = itertools.count(1)
+_search_flight = SingleFlight()
+
+
+def _cache_key(params):
+    # apikey is never part of the key so rotating it keeps the cache warm
+    return "&".join(f"{k}={params[k]}" for k in sorted(params) if k != "apikey")
+
+
+def _read_row(key):
+    # Core read without autoflush: rows are written on their own connection (see _store_in_db),
+    # and flushing the caller's pending changes here would lock SQLite against that write
+    table = OmdbCacheEntry.__table__
+    with db.session.no_autoflush:
+        return db.session.execute(
+            db.select(table.c.payload, table.c.expires_at).where(table.c.cache_key == key)
+        ).first()
+
+
+def _load_from_db(key):
+    row = _read_row(key)
+    if not row or row.expires_at <= datetime.now():
+        return None
+    payload = json.loads(row.payload)
+    memory_cache.set(key, payload, row.expires_at)
+    return payload
+
+
+def _load_stale(key):
+    # Expired rows stay in the table until evicted, so they double as last known good data
+    row = _read_row(key)
+    return json.loads(row.payload) if row else None
+
+
+def _evict_overflow(conn):
+    # Evict the entries closest to expiry once the table is over budget
+    table = OmdbCacheEntry.__table__
+    overflow = conn.execute(db.select(db.func.count()).select_from(table)).scalar() - OMDB_CACHE_MAX_ROWS
+    if overflow > 0:
+        stale_ids = conn.execute(
+            db.select(table.c.id).order_by(table.c.expires_at.asc()).limit(overflow)
+        ).scalars().all()
+        conn.execute(table.delete().where(table.c.id.in_(stale_ids)))
+
+
+def _store_in_db(key, payload, fetched_at, expires_at):
+    # Own connection and transaction, so a cache write never commits or rolls back the caller's session
+    table = OmdbCacheEntry.__table__
+    values = {"payload": json.dumps(payload), "fetched_at": fetched_at, "expires_at": expires_at}
+    try:
+        with db.engine.begin() as conn:
+            updated = conn.execute(table.update().where(table.c.cache_key == key).values(**values)).rowcount
+            if not updated:
+                conn.execute(table.insert().values(cache_key=key, **values))
+            # Counting the table on every write is wasted work; the budget is only checked now and then
+            if next(_cache_writes) % OMDB_CACHE_EVICT_EVERY == 0:
+                _evict_overflow(conn)
+    except Exception as exc:
+        # A cache write must never break the page that triggered it
+        print("OMDB cache write failed:", exc)
+
+
+def _call_upstream(params):
+    if not breaker.allow():
+        raise CircuitOpenError("OMDB circuit is open")
+    start = time.perf_counter()
+    try:
+        res = http_client.get(OMDB_URL, params={**params, "apikey": OMDB_API_KEY})
+        # OMDB reports a bad key or an exhausted daily quota as 401 ("Request limit reached!")
+        if res.status_code >= 500 or res.status_code in (401, 429):
+            raise OmdbUnavailable(f"OMDB returned HTTP {res.status_code}")
+        payload = res.json()
+    except Exception as exc:
+        breaker.record_failure()
+        if isinstance(exc, OmdbUnavailable):
+            raise
+        raise OmdbUnavailable(str(exc)) from exc
+    breaker.record_success(time.perf_counter() - start)
+    return payload
+
+
+_revalidate = {}
+_revalidate_app = None
+_revalidate_lock = threading.Lock()
+
+
+def _mark_for_revalidation(key, params):
+    global _revalidate_app
+    with _revalidate_lock:
+        _revalidate[key] = params
+        _revalidate_app = current_app._get_current_object()
+
+
+def _revalidate_stale():
+    # Breaker just closed: refresh everything that was served stale while it was open
+    with _revalidate_lock:
+        pending = list(_revalidate.values())
+        _revalidate.clear()
+        app = _revalidate_app
+    if not pending or app is None:
+        return
+
+    def run():
+        with app.app_context():
+            for params in pending:
+                try:
+                    fetch(params, refresh=True)
+                except OmdbUnavailable:
+                    break
+
+    threading.Thread(target=run, daemon=True, name="omdb-revalidate").start()
+
+
+breaker.on_close(_revalidate_stale)
+
+
+def fetch(params, ttl=None, refresh=False):
+    """Return the OMDB JSON response for params, reading through both cache tiers.
+
+    refresh=True skips the cache reads but still stores the new response.
+    When OMDB is failing or the breaker is open, the last known good
+    response is returned with STALE_KEY set and queued for revalidation;
+    OmdbUnavailable is raised only when there is nothing to fall back on.
+    Error payloads (Response "False") are kept in memory for
+    OMDB_NEGATIVE_TTL_SECONDS only and never replace a good response.
+    """
+    key = _cache_key(params)
+
+    if not refresh:
+        payload = memory_cache.get(key)
+        if payload is not None:
+            return payload
+
+        payload = _load_from_db(key)
+        if payload is not None:
+            return payload
+
+    try:
+        payload = _call_upstream(params)
+    except OmdbUnavailable:
+        stale = _load_stale(key)
+        if stale is None:
+            raise
+        _mark_for_revalidation(key, params)
+        breaker.count("stale_served")
+        return {**stale, STALE_KEY: True}
+
+    fetched_at = datetime.now()
+    if payload.get("Response") == "False":
+        # Error payloads never replace a good row; without one they are cached briefly in memory
+        stale = _load_stale(key)
+        if stale is not None and stale.get("Response") != "False":
+            return {**stale, STALE_KEY: True}
+        memory_cache.set(key, payload, fetched_at + timedelta(seconds=OMDB_NEGATIVE_TTL_SECONDS))
+        return payload
+
+    expires_at = fetched_at + timedelta(seconds=OMDB_CACHE_TTL_SECONDS if ttl is None else ttl)
+    memory_cache.set(key, payload, expires_at)
+    _store_in_db(key, payload, fetched_at, expires_at)
+    return payload
+
+
+def status():
+    """Breaker and cache state for monitoring."""
+    with _revalidate_lock:
+        pending = len(_revalidate)
+    return {
+        "breaker": breaker.snapshot(),
+        "memory_cache_entries": len(memory_cache),
+        "search_cache_entries": len(search_cache),
+        "pending_revalidation": pending,
+    }
+
+
+def get_movie(imdb_id, plot="short", refresh=False):
+    return fetch({"i": imdb_id, "plot": plot}, refresh=refresh)
+
+
+def search(query):
+    return fetch({"s": query, "type": "movie"})
+
+
+def _normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def _search_upstream(query):
+    res = _call_upstream({"s": query, "type": "movie"})
+    results = res.get("Search", []) if res.get("Response") != "False" else []
+    try:
+        total = int(res.get("totalResults", len(results)))
+    except (TypeError, ValueError):
+        total = len(results)
+    entry = {
+        "results": results,
+        # Only a result set that holds every match can answer narrower queries
+        "complete": res.get("Response") != "False" and total <= len(results),
+    }
+    search_cache.set(query, entry, datetime.now() + timedelta(seconds=OMDB_SEARCH_TTL_SECONDS))
+    return entry
+
+
+def _search_from_prefix(query):
+    for end in range(len(query) - 1, 1, -1):
+        entry = search_cache.get(query[:end])
+        if entry and entry["complete"]:
+            return [r for r in entry["results"] if query in (r.get("Title") or "").lower()]
+    return None
+
+
+def search_titles(query):
+    """Live title search for the admin picker.
+
+    Served from a short-TTL cache, narrowed from a complete cached result
+    for a shorter prefix when possible, and otherwise fetched once per
+    query no matter how many requests are waiting on it.
+    """
+    query = _normalize_query(query)
+    entry = search_cache.get(query)
+    if entry is not None:
+        return entry["results"]
+
+    results = _search_from_prefix(query)
+    if results is not None:
+        return results
+
+    return _search_flight.do(query, lambda: _search_upstream(query))["results"]
+
+
+# OMDB field -> Movie column for the stored detail record
+DETAIL_FIELDS = {
+    "Director": "director",
+    "Production": "production",
+    "Genre": "genre",
+    "imdbRating": "rating",
+    "Runtime": "runtime",
+    "Actors": "actors",
+    "Plot": "plot",
+    "Released": "released",
+}
+
+
+def apply_details(movie, omdb_data):
+    """Copy an OMDB detail response onto movie. Returns True when fresh details were stored.
+
+    Stale responses only fill in a movie that has no details yet, and never
+    advance refreshed_at, so the record is fetched again once OMDB recovers.
+    """
+    if not omdb_data or omdb_data.get("Response") == "False":
+        return False
+    stale = omdb_data.get(STALE_KEY, False)
+    if stale and movie.refreshed_at is not None:
+        return False
+    for field, column in DETAIL_FIELDS.items():
+        setattr(movie, column, omdb_data.get(field))
+    if not movie.poster and omdb_data.get("Poster"):
+        movie.poster = omdb_data["Poster"]
+    if stale:
+        return False
+    movie.refreshed_at = datetime.now()
+    return True
@@ -0,0 +1,101 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+
+from models import Booking, User, db
+from omdb import LRUCache
+
+DEFAULT_PAGE_SIZE = 50
+try:
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+except ValueError:
+    MAX_PAGE_SIZE = 200
+try:
+    COUNT_CACHE_TTL_SECONDS = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+except ValueError:
+    COUNT_CACHE_TTL_SECONDS = 30
+
+
+class InvalidPage(ValueError):
+    pass
+
+
+# Total counts per filter; other workers' writes show up once an entry expires
+_counts = LRUCache(256)
+
+
+def page_limit(raw, default=DEFAULT_PAGE_SIZE):
+    if raw in (None, ""):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidPage(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, db.DateTime) else int(v)
+            for col, v in zip(columns, values)
+        ]
+    except (TypeError, ValueError):
+        raise InvalidPage("cursor is invalid")
+
+
+def _after(columns, values, descending):
+    # (a, b) past (x, y) is a past x, or a = x and b past y; spelled out so indexes are used
+    column, value = columns[0], values[0]
+    past = column < value if descending else column > value
+    if len(columns) == 1:
+        return past
+    return db.or_(past, db.and_(column == value, _after(columns[1:], values[1:], descending)))
+
+
+def paginate(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """Return (rows, next_cursor) for one page of query ordered by columns.
+
+    columns must end with a unique column (the primary key) and hold no NULLs.
+    Raises InvalidPage for a malformed cursor.
+    """
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
+
+
+def cached_count(key, query):
+    total = _counts.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        _counts.set(key, total, datetime.now() + timedelta(seconds=COUNT_CACHE_TTL_SECONDS))
+    return total
+
+
+def invalidate_counts(*args):
+    _counts.clear()
+
+
+# Row-by-row inserts and deletes in this process retire the cached totals straight away;
+# bulk Query.delete() callers call invalidate_counts themselves
+for _model in (Booking, User):
+    db.event.listen(_model, "after_insert", invalidate_counts)
+    db.event.listen(_model, "after_delete", invalidate_counts)
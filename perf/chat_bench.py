@@ -0,0 +1,257 @@
+"""Chat latency benchmark against an in-process app and a fake Ollama.
+
+Replays a question corpus against ``/api/chat`` from several concurrent
+clients and reports latency percentiles, prompt size, and how much of each
+reply went to building context versus waiting on generation:
+
+    python perf/chat_bench.py --concurrency 8 --requests 200 --tokens-per-second 40
+
+By default the app runs on a throwaway SQLite database seeded from the OMDB
+fixtures (plus --synthetic N generated movies) and talks to a fake Ollama
+started in-process; pass --ollama-url or --database to use real ones.
+Exits non-zero when --max-p95-ms is exceeded, for use as a pre-deploy check.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from perf import fake_ollama, omdb_standin  # noqa: E402
+
+DEFAULT_QUESTIONS = Path(__file__).resolve().parent / "questions.txt"
+
+
+class Recorder:
+    """Thread-safe named lists of samples."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, value):
+        with self._lock:
+            self.samples.setdefault(name, []).append(value)
+
+    def get(self, name):
+        with self._lock:
+            return list(self.samples.get(name, []))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def read_questions(path):
+    lines = Path(path).read_text().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def seed_catalog(synthetic):
+    from chatbot import knowledge
+    from models import Movie, db
+    import omdb
+
+    store = omdb_standin.FixtureStore(omdb_standin.DEFAULT_FIXTURES, synthetic)
+    for data in store.movies.values():
+        movie = Movie(imdb_id=data["imdbID"], title=data["Title"], year=data["Year"], poster=data["Poster"])
+        omdb.apply_details(movie, data)
+        db.session.add(movie)
+    db.session.commit()
+    knowledge.sync_knowledge()
+    return len(store.movies)
+
+
+def instrument(recorder):
+    """Time context building and generation inside the chat path."""
+    from chatbot import chatbot_logic
+    import http_client
+
+    build_prompt = chatbot_logic.build_prompt
+    generate = chatbot_logic.generate
+
+    def timed_build_prompt(user_message, memory=None):
+        started = time.perf_counter()
+        prompt = build_prompt(user_message, memory)
+        recorder.add("context_ms", (time.perf_counter() - started) * 1000)
+        recorder.add("prompt_tokens", len(prompt) // 4)
+        return prompt
+
+    class TimedStream:
+        # Generation ends when the streamed response is closed, not when headers arrive
+        def __init__(self, res, started):
+            self._res = res
+            self._started = started
+
+        def __getattr__(self, name):
+            return getattr(self._res, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            recorder.add("generation_ms", (time.perf_counter() - self._started) * 1000)
+            return self._res.__exit__(*exc)
+
+    def timed_generate(prompt, stream=False):
+        started = time.perf_counter()
+        res = generate(prompt, stream=stream)
+        if stream:
+            return TimedStream(res, started)
+        recorder.add("generation_ms", (time.perf_counter() - started) * 1000)
+        return res
+
+    def first_byte_hook(method, url, elapsed, status, error):
+        if url.endswith("/api/generate"):
+            recorder.add("first_byte_ms", elapsed * 1000)
+
+    chatbot_logic.build_prompt = timed_build_prompt
+    chatbot_logic.generate = timed_generate
+    http_client.add_timing_hook(first_byte_hook)
+
+
+def run(app, questions, total, concurrency, recorder):
+    from flask_jwt_extended import create_access_token
+
+    def client_loop(client_id):
+        client = app.test_client()
+        with app.app_context():
+            client.set_cookie("access_token_cookie", create_access_token(identity=f"bench-{client_id}"))
+        for n in range(client_id, total, concurrency):
+            started = time.perf_counter()
+            response = client.post("/api/chat", json={"message": questions[n % len(questions)]})
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code == 503:
+                recorder.add("shed", 1)
+            elif response.status_code != 200:
+                recorder.add("errors", 1)
+            else:
+                recorder.add("latency_ms", elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client_loop, range(concurrency)))
+    return time.perf_counter() - started
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--database", help="SQLAlchemy URL of an existing catalog (default: seeded temp DB)")
+    parser.add_argument("--synthetic", type=int, default=0, help="add N generated movies to the seeded catalog")
+    parser.add_argument("--ollama-url", help="use this Ollama instead of the in-process fake")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="fake Ollama first-token latency")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=30)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the chatbot answer cache")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 when end-to-end p95 is above this")
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    questions = read_questions(options.questions)
+
+    fake = None
+    if not options.ollama_url:
+        fake_options = fake_ollama.build_parser().parse_args(
+            [
+                "--port", "0",
+                "--latency-ms", str(options.latency_ms),
+                "--tokens-per-second", str(options.tokens_per_second),
+                "--reply-tokens", str(options.reply_tokens),
+            ]
+        )
+        fake = fake_ollama.start(fake_options)
+        options.ollama_url = f"http://127.0.0.1:{fake.server_port}"
+
+    # Settings are read at import time, so they must be in place before the app loads
+    seed = not options.database
+    os.environ["DATABASE_URL"] = options.database or f"sqlite:///{tempfile.mkdtemp()}/chat_bench.db"
+    os.environ["OLLAMA_URL"] = options.ollama_url
+    os.environ["OLLAMA_WARMUP"] = "0"
+    os.environ.setdefault("SECRET_KEY", "chat-bench")
+    os.environ.setdefault("JWT_SECRET_KEY", "chat-bench")
+    os.environ.setdefault("PEPPER", "chat-bench")
+
+    from app import app
+    from chatbot import answer_cache, knowledge
+
+    with app.app_context():
+        movies = seed_catalog(options.synthetic) if seed else None
+        knowledge.get_snapshot()
+    if options.no_cache:
+        answer_cache.get = lambda key: None
+
+    recorder = Recorder()
+    instrument(recorder)
+    wall = run(app, questions, options.requests, options.concurrency, recorder)
+    if fake:
+        fake.shutdown()
+
+    latencies = recorder.get("latency_ms")
+    report = {
+        "requests": options.requests,
+        "concurrency": options.concurrency,
+        "catalog_movies": movies,
+        "ok": len(latencies),
+        "shed": len(recorder.get("shed")),
+        "errors": len(recorder.get("errors")),
+        "llm_calls": len(recorder.get("generation_ms")),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "latency_ms": summarize(latencies),
+        "context_ms": summarize(recorder.get("context_ms")),
+        "generation_ms": summarize(recorder.get("generation_ms")),
+        "first_byte_ms": summarize(recorder.get("first_byte_ms")),
+        "prompt_tokens": summarize(recorder.get("prompt_tokens")),
+    }
+
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['ok']}/{options.requests} ok, {report['shed']} shed, {report['errors']} errors, "
+              f"{report['llm_calls']} LLM calls, {report['throughput_rps']} req/s at concurrency {options.concurrency}")
+        for name in ("latency_ms", "context_ms", "generation_ms", "first_byte_ms", "prompt_tokens"):
+            stats = report[name]
+            if stats["count"]:
+                print(f"  {name:<14} p50 {stats['p50']:>9}  p95 {stats['p95']:>9}  p99 {stats['p99']:>9}  max {stats['max']:>9}")
+
+    p95 = report["latency_ms"].get("p95")
+    if options.max_p95_ms is not None and (p95 is None or p95 > options.max_p95_ms):
+        print(f"End-to-end p95 {p95} ms is above the {options.max_p95_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
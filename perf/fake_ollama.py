@@ -0,0 +1,192 @@
+"""Offline Ollama-compatible stand-in for chat benchmarks.
+
+Answers ``POST /api/generate`` (streaming and not) with canned text at a
+configurable token rate after a configurable first-token latency, and
+``POST /api/embed`` with cheap hashed bag-of-words vectors:
+
+    python perf/fake_ollama.py --port 11435 --latency-ms 300 --tokens-per-second 40
+    OLLAMA_URL=http://127.0.0.1:11435 flask run
+
+--cold-start-ms adds a one-off model load penalty to the first request, or
+to any request arriving after --keep-alive-seconds of inactivity, so the
+effect of keep-alive and warm-up can be measured.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_WORDS = (
+    "Based on the movies showing right now I would pick the one that best matches "
+    "what you asked about since it has a strong rating and a fun premise for tonight"
+).split()
+
+
+EMBED_DIMENSIONS = 64
+
+
+def fake_embedding(text):
+    # Hashed bag of words: texts sharing words get similar vectors
+    vector = [0.0] * EMBED_DIMENSIONS
+    for word in text.lower().split():
+        digest = hashlib.md5(word.strip(".,:;!?").encode()).digest()
+        vector[digest[0] % EMBED_DIMENSIONS] += 1.0
+    return vector
+
+
+def reply_tokens(count):
+    return [REPLY_WORDS[n % len(REPLY_WORDS)] + " " for n in range(count)]
+
+
+class ModelState:
+    """Tracks when the fake model was last used, to simulate unloading."""
+
+    def __init__(self, keep_alive_seconds):
+        self.keep_alive_seconds = keep_alive_seconds
+        self.last_used = None
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def touch(self):
+        # Returns True when this request has to pay the model load
+        with self._lock:
+            now = time.monotonic()
+            cold = self.last_used is None or now - self.last_used > self.keep_alive_seconds
+            if cold:
+                self.loads += 1
+            self.last_used = now
+            return cold
+
+
+def make_handler(model, options):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if options.verbose:
+                super().log_message(fmt, *args)
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send(200, {"models": [{"name": "fake"}]})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/api/embed":
+                inputs = body.get("input", [])
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                self._send(200, {"model": body.get("model"), "embeddings": [fake_embedding(t) for t in inputs]})
+                return
+            if self.path != "/api/generate":
+                self._send(404, {"error": "not found"})
+                return
+
+            if model.touch() and options.cold_start_ms:
+                time.sleep(options.cold_start_ms / 1000)
+            if random.random() < options.error_rate:
+                self._send(500, {"error": "Injected failure"})
+                return
+
+            prompt = body.get("prompt", "")
+            if not prompt:
+                # Warm-up request: load the model and return without generating
+                self._send(200, {"model": body.get("model"), "response": "", "done": True})
+                return
+
+            delay = options.latency_ms + random.uniform(0, options.jitter_ms)
+            time.sleep(delay / 1000)
+            tokens = reply_tokens(options.reply_tokens)
+            gap = 1 / options.tokens_per_second if options.tokens_per_second > 0 else 0
+            stats = {"prompt_eval_count": max(1, len(prompt) // 4), "eval_count": len(tokens)}
+
+            if body.get("stream", True) is False:
+                time.sleep(gap * len(tokens))
+                reply = "".join(tokens).strip()
+                self._send(200, {"model": body.get("model"), "response": reply, "done": True, **stats})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(gap)
+                self._chunk({"model": body.get("model"), "response": token, "done": False})
+            self._chunk({"model": body.get("model"), "response": "", "done": True, **stats})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, payload):
+            line = json.dumps(payload).encode() + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="delay before the first token")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=30)
+    parser.add_argument("--cold-start-ms", type=float, default=0.0, help="model load penalty when cold")
+    parser.add_argument("--keep-alive-seconds", type=float, default=300.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    verbose = False
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled keep-alive connections is routine here
+        if self.verbose:
+            super().handle_error(request, client_address)
+
+
+def make_server(options):
+    state = ModelState(options.keep_alive_seconds)
+    server = FakeOllamaServer((options.host, options.port), make_handler(state, options))
+    server.verbose = options.verbose
+    return server
+
+
+def start(options):
+    """Start a fake server on a daemon thread and return it."""
+    server = make_server(options)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-ollama").start()
+    return server
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    server = make_server(options)
+    print(f"Fake Ollama serving on http://{options.host}:{options.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Offline OMDB-compatible stand-in for load tests and benchmarks.
+
+Serves the ``?i=`` and ``?s=`` lookups the app uses from a JSON fixture
+file, with optional injected latency and error rate:
+
+    python perf/omdb_standin.py --port 8081 --latency-ms 80 --error-rate 0.02
+    OMDB_URL=http://127.0.0.1:8081/ python seed.py
+
+With --record, misses are proxied to the real API and written back to the
+fixture file so later runs can replay them offline.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / "fixtures" / "omdb.json"
+PAGE_SIZE = 10
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Animation", "Romance", "Thriller"]
+
+
+class FixtureStore:
+    def __init__(self, path, synthetic=0):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.movies = {m["imdbID"]: m for m in data.get("movies", [])}
+        self.searches = data.get("searches", {})
+        for n in range(synthetic):
+            movie = synthetic_movie(n)
+            self.movies.setdefault(movie["imdbID"], movie)
+
+    def save(self):
+        with self._lock:
+            real = [m for m in self.movies.values() if not m.get("Synthetic")]
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({"movies": real, "searches": self.searches}, indent=2))
+
+    def lookup(self, imdb_id):
+        movie = self.movies.get(imdb_id)
+        if movie is None:
+            return None
+        return {k: v for k, v in movie.items() if k != "Synthetic"}
+
+    def search(self, query, page=1):
+        recorded = self.searches.get(query.lower())
+        if recorded is not None:
+            return recorded
+
+        words = query.lower().split()
+        matches = [
+            m for m in self.movies.values()
+            if all(w in m.get("Title", "").lower() for w in words)
+        ]
+        if not matches:
+            return {"Response": "False", "Error": "Movie not found!"}
+        start = (page - 1) * PAGE_SIZE
+        return {
+            "Search": [
+                {k: m.get(k) for k in ("Title", "Year", "imdbID", "Type", "Poster")}
+                for m in matches[start:start + PAGE_SIZE]
+            ],
+            "totalResults": str(len(matches)),
+            "Response": "True",
+        }
+
+
+def synthetic_movie(n):
+    genre = GENRES[n % len(GENRES)]
+    return {
+        "Title": f"Synthetic Feature {n:04d}",
+        "Year": "2025",
+        "Rated": "PG-13",
+        "Released": "01 Nov 2025",
+        "Runtime": f"{90 + n % 60} min",
+        "Genre": f"{genre}, {GENRES[(n + 3) % len(GENRES)]}",
+        "Director": f"Director {n % 37}",
+        "Actors": f"Actor {n % 53}, Actor {(n * 7) % 53}, Actor {(n * 11) % 53}",
+        "Plot": f"A {genre.lower()} story about case number {n} and the people caught up in it.",
+        "Poster": "N/A",
+        "imdbRating": f"{5 + (n % 45) / 10:.1f}",
+        "imdbID": f"tt9{n:07d}",
+        "Type": "movie",
+        "Production": "Stand-in Pictures",
+        "Response": "True",
+        "Synthetic": True,
+    }
+
+
+def make_handler(store, options):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            if options.verbose:
+                super().log_message(fmt, *args)
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _record(self, params):
+            upstream_params = {k: v[0] for k, v in params.items()}
+            upstream_params["apikey"] = options.upstream_key
+            return requests.get(options.upstream, params=upstream_params, timeout=10).json()
+
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            delay = options.latency_ms + random.uniform(0, options.jitter_ms)
+            if delay:
+                time.sleep(delay / 1000)
+            if random.random() < options.error_rate:
+                self._send(503, {"Response": "False", "Error": "Injected failure"})
+                return
+
+            if "i" in params:
+                imdb_id = params["i"][0]
+                payload = store.lookup(imdb_id)
+                if payload is None and options.record:
+                    payload = self._record(params)
+                    if payload.get("Response") == "True":
+                        store.movies[imdb_id] = payload
+                        store.save()
+                self._send(200, payload or {"Response": "False", "Error": "Incorrect IMDb ID."})
+            elif "s" in params:
+                query = params["s"][0]
+                if options.record and query.lower() not in store.searches:
+                    store.searches[query.lower()] = self._record(params)
+                    store.save()
+                try:
+                    page = int(params.get("page", ["1"])[0])
+                except ValueError:
+                    page = 1
+                self._send(200, store.search(query, page))
+            else:
+                self._send(200, {"Response": "False", "Error": "No API key provided."})
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES))
+    parser.add_argument("--synthetic", type=int, default=0, help="add N generated movies to the catalog")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--record", action="store_true", help="proxy misses upstream and save them")
+    parser.add_argument("--upstream", default="http://www.omdbapi.com/")
+    parser.add_argument("--upstream-key", default="225f5d3d")
+    parser.add_argument("--verbose", action="store_true")
+    options = parser.parse_args(argv)
+
+    store = FixtureStore(options.fixtures, options.synthetic)
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(store, options))
+    print(f"OMDB stand-in serving {len(store.movies)} movies on http://{options.host}:{options.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
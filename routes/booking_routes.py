@@ -2,8 +2,12 @@ import os
 
 import stripe
 from flask import Blueprint, jsonify, render_template, request, session, url_for
-from datetime import datetime, date
-from models import Booking, Movie, db
+from datetime import date
+from sqlalchemy.exc import IntegrityError
+from models import Booking, Movie, User, db
+import holds
+import pagination
+import showtimes
 
 booking_bp = Blueprint("booking_api", __name__)
 
@@ -12,12 +16,57 @@ try:
     TICKET_PRICE_CENTS = int(os.getenv("TICKET_PRICE_CENTS", "1500"))
 except ValueError:
     TICKET_PRICE_CENTS = 1500
+MAX_IDEMPOTENCY_KEY_LENGTH = 100
+try:
+    MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+except ValueError:
+    MAX_BATCH_SIZE = 100
+
+
+def _booking_json(booking):
+    return {
+        "id": booking.id,
+        "movie_title": booking.movie_title,
+        "date": booking.show_date.isoformat(),
+        "showtime": {
+            "time": booking.showtime,
+            "available": booking.showtime_available,
+        },
+        "quantity": booking.quantity,
+        "user": booking.booked_by,
+    }
+
+
+def _replay(idempotency_key, request_fields):
+    # A retried request gets the original booking back; a reused key with a different body is refused
+    existing = Booking.query.filter_by(idempotency_key=idempotency_key).first()
+    if existing is None:
+        return None
+    stored = (existing.movie_title, existing.show_date, existing.showtime, existing.quantity, existing.booked_by)
+    if stored != request_fields:
+        return jsonify({"message": "Idempotency-Key was already used for a different booking"}), 422
+    response = jsonify({"message": "Booking stored successfully", "booking": _booking_json(existing)})
+    response.headers["Idempotent-Replayed"] = "true"
+    return response, 201
+
+
+def _date_error(movie, show_date):
+    # Catalog movies can only be booked from today until they leave theaters
+    if not movie or not movie.expiration:
+        return None
+    booking_date_obj = showtimes.parse_date(show_date)
+    if booking_date_obj < date.today():
+        return "You cannot book a date in the past."
+    if booking_date_obj > movie.expiration:
+        return f"This movie is no longer in theaters after {movie.expiration}."
+    return None
 
 
 @booking_bp.route("/api/bookings", methods=["POST"])
 def post_booking():
     #add a booking to the database
     payload = request.get_json() or {}
+    idempotency_key = request.headers.get("Idempotency-Key")
     movie_title = payload.get("movie_title")
     show_date = payload.get("date") or payload.get("data")
     showtime_payload = payload.get("showtime") or {}
@@ -31,10 +80,14 @@ def post_booking():
         errors.append("movie_title is required.")
     if not show_date:
         errors.append("date is required.")
+    elif showtimes.parse_date(show_date) is None:
+        errors.append("date must be YYYY-MM-DD.")
     if not showtime_time:
         errors.append("showtime.time is required.")
     if not booked_by:
         errors.append("user is required.")
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        errors.append(f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters.")
 
     try:
         quantity = int(quantity_raw)
@@ -53,19 +106,21 @@ def post_booking():
 
     if errors:
         return jsonify({"message": "Invalid booking payload", "errors": errors}), 400
-    
+
+    # Compare parsed dates so "2026-1-5" replays a booking stored as 2026-01-05
+    request_fields = (movie_title, showtimes.parse_date(show_date), showtime_time, quantity, booked_by)
+    if idempotency_key:
+        replayed = _replay(idempotency_key, request_fields)
+        if replayed is not None:
+            return replayed
+
     movie = Movie.query.filter_by(title=movie_title).first()
-    if movie and movie.expiration:
-        today = date.today()
-        booking_date_obj = datetime.strptime(show_date, "%Y-%m-%d").date()
-        # Cannot book before today
-        if booking_date_obj < today:
-            return jsonify({"message": "You cannot book a date in the past."}), 400
-        # Cannot book after expiration
-        if booking_date_obj > movie.expiration:
-            return jsonify({
-                "message": f"This movie is no longer in theaters after {movie.expiration}."
-            }), 400
+    date_error = _date_error(movie, show_date)
+    if date_error:
+        return jsonify({"message": date_error}), 400
+
+    # Catalog showings have real seat inventory; the client's "available" is only trusted otherwise
+    inventory = showtimes.find(movie_title, show_date, showtime_time, movie=movie)
 
     booking = Booking(
         movie_title=movie_title,
@@ -74,34 +129,181 @@ def post_booking():
         showtime_available=showtime_available,
         quantity=quantity,
         booked_by=booked_by,
+        idempotency_key=idempotency_key or None,
     )
 
     try:
+        if inventory is not None:
+            showtimes.reserve(inventory, quantity)
+            booking.showtime_available = inventory.remaining
         db.session.add(booking)
         db.session.commit()
+    except showtimes.SoldOut as exc:
+        db.session.rollback()
+        return jsonify({"message": "Not enough seats available", "available": exc.remaining}), 409
+    except IntegrityError as exc:
+        # A concurrent request with the same key won the insert; its seats are the only ones taken
+        db.session.rollback()
+        replayed = _replay(idempotency_key, request_fields) if idempotency_key else None
+        if replayed is not None:
+            return replayed
+        return jsonify({"message": "Failed to save booking", "error": str(exc)}), 500
     except Exception as exc:
         db.session.rollback()
         return jsonify({"message": "Failed to save booking", "error": str(exc)}), 500
 
-    return (
-        jsonify(
-            {
-                "message": "Booking stored successfully",
-                "booking": {
-                    "id": booking.id,
-                    "movie_title": booking.movie_title,
-                    "date": booking.show_date,
-                    "showtime": {
-                        "time": booking.showtime,
-                        "available": booking.showtime_available,
-                    },
-                    "quantity": booking.quantity,
-                    "user": booking.booked_by,
-                },
-            }
-        ),
-        201,
-    )
+    return jsonify({"message": "Booking stored successfully", "booking": _booking_json(booking)}), 201
+
+
+def _batch_items(key):
+    payload = request.get_json(silent=True) or {}
+    items = payload.get(key)
+    if not isinstance(items, list) or not 1 <= len(items) <= MAX_BATCH_SIZE:
+        return None, (jsonify({"message": f"{key} must be a list of 1-{MAX_BATCH_SIZE} items"}), 400)
+    return items, None
+
+
+@booking_bp.route("/api/bookings/batch", methods=["POST"])
+def post_bookings_batch():
+    # Store many bookings in one transaction; each item is reported on its own
+    username = session.get("username")
+    if not username:
+        return jsonify({"message": "Authentication required"}), 401
+    is_admin = session.get("role") == "admin"
+
+    items, error = _batch_items("bookings")
+    if error:
+        return error
+
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("showtime") or {}, dict):
+            results[index] = {"index": index, "status": 400, "errors": ["Each booking must be an object."]}
+            continue
+        validated = _validate_booking_payload(item)
+        text_fields = ("movie_title", "showtime_time", "booked_by")
+        if not validated["errors"] and not all(isinstance(validated[f], str) for f in text_fields):
+            validated["errors"].append("movie_title, showtime.time and user must be strings.")
+        if validated["errors"]:
+            results[index] = {"index": index, "status": 400, "errors": validated["errors"]}
+        elif not is_admin and validated["booked_by"] != username:
+            # Only admins may book seats on someone else's behalf
+            results[index] = {"index": index, "status": 403, "message": "Not authorized to book for another user"}
+        else:
+            pending.append((index, validated))
+
+    # One query resolves every catalog movie and account named in the batch
+    titles = {v["movie_title"] for _, v in pending}
+    movies = {}
+    for movie in Movie.query.filter(Movie.title.in_(titles)).order_by(Movie.id).all():
+        movies.setdefault(movie.title, movie)
+    usernames = {v["booked_by"] for _, v in pending}
+    user_ids = dict(db.session.query(User.username, User.id).filter(User.username.in_(usernames)).all())
+
+    # Showing rows are created (and committed) once per showing before the bookings transaction
+    inventory = {}
+    accepted = []
+    for index, validated in pending:
+        movie = movies.get(validated["movie_title"])
+        date_error = _date_error(movie, validated["show_date"])
+        if date_error:
+            results[index] = {"index": index, "status": 400, "message": date_error}
+            continue
+        slot = (validated["movie_title"], validated["show_date"], validated["showtime_time"])
+        if slot not in inventory:
+            inventory[slot] = showtimes.find(*slot, movie=movie) if movie else None
+        accepted.append((index, validated, movie, inventory[slot]))
+
+    created = []
+    try:
+        for index, validated, movie, row in accepted:
+            if row is not None:
+                try:
+                    showtimes.reserve(row, validated["quantity"])
+                except showtimes.SoldOut as exc:
+                    # A refused reservation changed nothing, so the rest of the batch carries on
+                    results[index] = {
+                        "index": index, "status": 409,
+                        "message": "Not enough seats available", "available": exc.remaining,
+                    }
+                    continue
+            booking = Booking(
+                movie_id=movie.id if movie else None,
+                movie_title=validated["movie_title"],
+                show_date=validated["show_date"],
+                showtime=validated["showtime_time"],
+                showtime_available=row.remaining if row is not None else validated["showtime_available"],
+                quantity=validated["quantity"],
+                user_id=user_ids.get(validated["booked_by"]),
+                booked_by=validated["booked_by"],
+            )
+            db.session.add(booking)
+            created.append((index, booking))
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        return jsonify({"message": "Failed to save bookings", "error": str(exc)}), 500
+
+    for index, booking in created:
+        results[index] = {"index": index, "status": 201, "booking": _booking_json(booking)}
+    return jsonify({"message": "Batch processed", "created": len(created), "results": results})
+
+
+@booking_bp.route("/api/bookings/batch-cancel", methods=["POST"])
+def cancel_bookings_batch():
+    # Cancel many bookings in one transaction; users may only cancel their own
+    username = session.get("username")
+    if not username:
+        return jsonify({"message": "Authentication required"}), 401
+    is_admin = session.get("role") == "admin"
+
+    items, error = _batch_items("booking_ids")
+    if error:
+        return error
+
+    ids = {item for item in items if isinstance(item, int) and not isinstance(item, bool)}
+    bookings = {b.id: b for b in Booking.query.filter(Booking.id.in_(ids)).all()}
+    results = []
+    cancelled = {}
+    for booking_id in items:
+        if isinstance(booking_id, bool) or not isinstance(booking_id, int):
+            results.append({"booking_id": booking_id, "status": 400, "message": "booking id must be an integer"})
+            continue
+        booking = bookings.get(booking_id)
+        if booking_id in cancelled:
+            results.append({"booking_id": booking_id, "status": 400, "message": "Booking listed more than once"})
+        elif booking is None:
+            results.append({"booking_id": booking_id, "status": 404, "message": "Booking not found"})
+        elif not is_admin and booking.booked_by != username:
+            results.append({"booking_id": booking_id, "status": 403, "message": "Not authorized to cancel this booking"})
+        else:
+            cancelled[booking_id] = booking
+            results.append({"booking_id": booking_id, "status": 200, "message": "Booking cancelled"})
+
+    if cancelled:
+        try:
+            showtimes.release_bookings(cancelled.values())
+            Booking.query.filter(Booking.id.in_(cancelled)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            return jsonify({"message": "Failed to cancel bookings", "error": str(exc)}), 500
+        pagination.invalidate_counts()
+
+    return jsonify({"message": "Batch processed", "cancelled": len(cancelled), "results": results})
+
+
+@booking_bp.route("/api/showtimes", methods=["GET"])
+def list_showtimes():
+    # Live seat availability for a movie on a date
+    movie = Movie.query.filter_by(imdb_id=request.args.get("movie")).first()
+    if not movie:
+        return jsonify({"message": "Movie not found"}), 404
+    show_date = showtimes.parse_date(request.args.get("date"))
+    if show_date is None:
+        return jsonify({"message": "date must be YYYY-MM-DD"}), 400
+    return jsonify({"date": show_date.isoformat(), "showtimes": showtimes.availability(movie, show_date)})
 
 
 @booking_bp.route("/api/bookings", methods=["GET"])
@@ -110,24 +312,54 @@ def list_bookings():
     if session.get("role") != "admin":
         return jsonify({"message": "Admin access required"}), 403
 
-    bookings = (
-        Booking.query.order_by(Booking.created_at.desc())
-        if hasattr(Booking, "created_at")
-        else Booking.query.all()
-    )
+    # Optional filters: movie (imdb id), from/to (YYYY-MM-DD, inclusive) and user (username)
+    query = Booking.query
+    filters = {}
+    # An unknown movie or user matches nothing; filtering on its missing id would match NULL links
+    unknown = False
+    if request.args.get("movie"):
+        movie = Movie.query.filter_by(imdb_id=request.args["movie"]).first()
+        unknown = unknown or movie is None
+        filters["movie"] = movie.id if movie else None
+        query = query.filter(Booking.movie_id == filters["movie"])
+    for name in ("from", "to"):
+        if not request.args.get(name):
+            continue
+        bound = showtimes.parse_date(request.args[name])
+        if bound is None:
+            return jsonify({"message": f"{name} must be YYYY-MM-DD"}), 400
+        filters[name] = bound.isoformat()
+        query = query.filter(Booking.show_date >= bound if name == "from" else Booking.show_date <= bound)
+    if request.args.get("user"):
+        user = User.query.filter_by(username=request.args["user"]).first()
+        unknown = unknown or user is None
+        filters["user"] = user.id if user else None
+        query = query.filter(Booking.user_id == filters["user"])
+
+    try:
+        limit = pagination.page_limit(request.args.get("limit"))
+        if unknown:
+            return jsonify({"bookings": [], "next_cursor": None, "total": 0})
+        bookings, next_cursor = pagination.paginate(
+            query, [Booking.created_at, Booking.id], request.args.get("cursor"), limit
+        )
+    except pagination.InvalidPage as exc:
+        return jsonify({"message": str(exc)}), 400
+
     payload = [
         {
             "id": b.id,
             "movie_title": b.movie_title,
-            "date": b.show_date,
+            "date": b.show_date.isoformat(),
             "showtime": b.showtime,
             "quantity": b.quantity,
             "user": b.booked_by,
-            "created_at": b.created_at.isoformat() if getattr(b, "created_at", None) else None,
+            "created_at": b.created_at.isoformat() if b.created_at else None,
         }
         for b in bookings
     ]
-    return jsonify({"bookings": payload})
+    total = pagination.cached_count(f"bookings:{sorted(filters.items())}", query)
+    return jsonify({"bookings": payload, "next_cursor": next_cursor, "total": total})
 
 
 def _validate_booking_payload(payload, allow_session_user=True):
@@ -144,6 +376,8 @@ def _validate_booking_payload(payload, allow_session_user=True):
         errors.append("movie_title is required.")
     if not show_date:
         errors.append("date is required.")
+    elif showtimes.parse_date(show_date) is None:
+        errors.append("date must be YYYY-MM-DD.")
     if not showtime_time:
         errors.append("showtime.time is required.")
     if not booked_by:
@@ -190,8 +424,29 @@ def create_checkout_session():
     if not stripe.api_key:
         return jsonify({"message": "Stripe not configured"}), 500
 
+    # Hold the seats while the buyer is on Stripe; the sweeper gives them back if they never pay
+    inventory = showtimes.find(validated["movie_title"], validated["show_date"], validated["showtime_time"])
+    session_expires_at, hold_expires_at = holds.checkout_window()
+    hold = None
+    if inventory is not None:
+        try:
+            hold = holds.create(inventory, validated["quantity"], username, expires_at=hold_expires_at)
+        except showtimes.SoldOut as exc:
+            return jsonify({"message": "Not enough seats available", "available": exc.remaining}), 409
+
     # Use per-ticket price; Stripe will multiply by quantity internally
     unit_amount = TICKET_PRICE_CENTS
+    metadata = {
+        "movie_title": validated["movie_title"],
+        "date": validated["show_date"],
+        "showtime": validated["showtime_time"],
+        "quantity": str(validated["quantity"]),
+        "user": validated["booked_by"],
+    }
+    cancel_url = url_for("booking_api.checkout_cancel", _external=True)
+    if hold is not None:
+        metadata["hold_id"] = str(hold.id)
+        cancel_url = url_for("booking_api.checkout_cancel", hold=hold.id, _external=True)
 
     try:
         checkout_session = stripe.checkout.Session.create(
@@ -211,24 +466,25 @@ def create_checkout_session():
             ],
             success_url=url_for("booking_api.checkout_success", _external=True)
             + "?session_id={CHECKOUT_SESSION_ID}",
-            cancel_url=url_for("booking_api.checkout_cancel", _external=True),
-            metadata={
-                "movie_title": validated["movie_title"],
-                "date": validated["show_date"],
-                "showtime": validated["showtime_time"],
-                "quantity": str(validated["quantity"]),
-                "user": validated["booked_by"],
-            },
+            cancel_url=cancel_url,
+            metadata=metadata,
+            expires_at=int(session_expires_at.timestamp()),
         )
+        if hold is not None:
+            holds.attach_session(hold, checkout_session.id)
     except Exception as exc:
+        db.session.rollback()
+        if hold is not None:
+            holds.release(hold)
+            db.session.commit()
         return jsonify({"message": "Failed to create checkout session", "error": str(exc)}), 500
 
     return jsonify({"checkout_url": checkout_session.url})
 
 
-def _persist_booking_from_metadata(metadata):
+def _persist_booking_from_metadata(metadata, checkout_session_id):
     required_keys = ["movie_title", "date", "showtime", "quantity", "user"]
-    if not all(key in metadata for key in required_keys):
+    if not checkout_session_id or not all(key in metadata for key in required_keys):
         return None
 
     try:
@@ -239,25 +495,42 @@ def _persist_booking_from_metadata(metadata):
     if quantity is None or quantity <= 0:
         return None
 
-    existing = Booking.query.filter_by(
-        movie_title=metadata.get("movie_title"),
-        show_date=metadata.get("date"),
-        showtime=metadata.get("showtime"),
-        booked_by=metadata.get("user"),
-        quantity=quantity,
-    ).first()
+    # Stripe retries webhooks and users reload the success page; one booking per checkout session
+    existing = Booking.query.filter_by(checkout_session_id=checkout_session_id).first()
     if existing:
         return existing
 
+    inventory = showtimes.find(metadata.get("movie_title"), metadata.get("date"), metadata.get("showtime"))
+    hold = holds.lookup(checkout_session_id, metadata.get("hold_id"))
     booking = Booking(
         movie_title=metadata.get("movie_title"),
         show_date=metadata.get("date"),
         showtime=metadata.get("showtime"),
         quantity=quantity,
         booked_by=metadata.get("user"),
+        checkout_session_id=checkout_session_id,
     )
-    db.session.add(booking)
-    db.session.commit()
+    try:
+        # Converting the hold claims the seats taken when checkout started
+        converted = hold is not None and holds.convert(hold)
+        if hold is not None and not converted and hold.status == "converted":
+            # The success page and the webhook raced; the other one stored the booking
+            db.session.rollback()
+            return Booking.query.filter_by(checkout_session_id=checkout_session_id).first()
+        if not converted and inventory is not None:
+            # No hold, or it lapsed before payment finished: take the seats now if they are still free
+            showtimes.reserve(inventory, quantity)
+        if inventory is not None:
+            booking.showtime_available = inventory.remaining
+        db.session.add(booking)
+        db.session.flush()
+        if converted:
+            hold.booking_id = booking.id
+        db.session.commit()
+    except IntegrityError:
+        # Lost the insert race for this session; the winner's booking (and seats) stand
+        db.session.rollback()
+        return Booking.query.filter_by(checkout_session_id=checkout_session_id).first()
     return booking
 
 
@@ -278,7 +551,13 @@ def checkout_success():
     metadata = checkout_session.get("metadata", {}) if checkout_session else {}
     booking = None
     try:
-        booking = _persist_booking_from_metadata(metadata)
+        booking = _persist_booking_from_metadata(metadata, checkout_session.get("id") or session_id)
+    except showtimes.SoldOut:
+        db.session.rollback()
+        return render_template(
+            "checkout_success.html", booking=None,
+            message="Payment succeeded, but the showtime sold out. Please contact us for a refund.",
+        )
     except Exception:
         db.session.rollback()
         return render_template("checkout_success.html", booking=None, message="Payment succeeded, but failed to save booking.")
@@ -288,6 +567,22 @@ def checkout_success():
 
 @booking_bp.route("/checkout/cancel")
 def checkout_cancel():
+    # Give held seats back straight away instead of waiting for the hold to expire
+    hold = holds.lookup(hold_id=request.args.get("hold"))
+    if hold is not None and hold.username == session.get("username"):
+        try:
+            released = holds.release(hold)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            released = False
+            print("Could not release seat hold:", exc)
+        if released and hold.checkout_session_id and stripe.api_key:
+            # Stop the abandoned session from taking a payment for seats it no longer holds
+            try:
+                stripe.checkout.Session.expire(hold.checkout_session_id)
+            except Exception as exc:
+                print("Could not expire checkout session:", exc)
     return render_template("checkout_cancel.html")
 
 @booking_bp.route("/webhook/stripe", methods=["POST"])
@@ -307,10 +602,25 @@ def stripe_webhook():
         session_obj = event["data"]["object"]
         metadata = session_obj.get("metadata", {}) if session_obj else {}
         try:
-            _persist_booking_from_metadata(metadata)
+            _persist_booking_from_metadata(metadata, session_obj.get("id"))
+        except showtimes.SoldOut:
+            # Retrying cannot free seats; the payment needs a manual refund
+            db.session.rollback()
+            print("Paid checkout for a sold-out showtime:", session_obj.get("id"))
         except Exception:
             db.session.rollback()
             return "", 500
+    elif event and event.get("type") == "checkout.session.expired":
+        session_obj = event["data"]["object"]
+        metadata = session_obj.get("metadata", {}) if session_obj else {}
+        hold = holds.lookup(session_obj.get("id"), metadata.get("hold_id"))
+        if hold is not None:
+            try:
+                holds.release(hold)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                return "", 500
 
     return "", 200
 
@@ -333,6 +643,8 @@ def update_booking(booking_id):
         new_date = payload.get("date")
         if not new_date:
             return jsonify({"message": "date cannot be empty"}), 400
+        if showtimes.parse_date(new_date) is None:
+            return jsonify({"message": "date must be YYYY-MM-DD"}), 400
         updates["show_date"] = new_date
     if "showtime" in payload:
         showtime_payload = payload.get("showtime") or {}
@@ -357,6 +669,16 @@ def update_booking(booking_id):
     if not updates:
         return jsonify({"message": "No valid fields provided for update"}), 400
 
+    # Move the seats from the old showing to the new one (both may be untracked)
+    old_inventory = showtimes.find(booking.movie_title, booking.show_date, booking.showtime, create=False)
+    new_inventory = showtimes.find(
+        booking.movie_title,
+        updates.get("show_date", booking.show_date),
+        updates.get("showtime", booking.showtime),
+    )
+    old_quantity = booking.quantity
+    new_quantity = updates.get("quantity", old_quantity)
+
     for field, value in updates.items():
         setattr(booking, field, value)
 
@@ -364,27 +686,27 @@ def update_booking(booking_id):
     booking.booked_by = original_booked_by
 
     try:
+        if old_inventory is not None and new_inventory is not None and old_inventory.id == new_inventory.id:
+            if new_quantity > old_quantity:
+                showtimes.reserve(new_inventory, new_quantity - old_quantity)
+            elif new_quantity < old_quantity:
+                showtimes.release(new_inventory, old_quantity - new_quantity)
+        else:
+            if old_inventory is not None:
+                showtimes.release(old_inventory, old_quantity)
+            if new_inventory is not None:
+                showtimes.reserve(new_inventory, new_quantity)
+        if new_inventory is not None:
+            booking.showtime_available = new_inventory.remaining
         db.session.commit()
+    except showtimes.SoldOut as exc:
+        db.session.rollback()
+        return jsonify({"message": "Not enough seats available", "available": exc.remaining}), 409
     except Exception as exc:
         db.session.rollback()
         return jsonify({"message": "Failed to update booking", "error": str(exc)}), 500
 
-    return jsonify(
-        {
-            "message": "Booking updated successfully",
-            "booking": {
-                "id": booking.id,
-                "movie_title": booking.movie_title,
-                "date": booking.show_date,
-                "showtime": {
-                    "time": booking.showtime,
-                    "available": booking.showtime_available,
-                },
-                "quantity": booking.quantity,
-                "user": booking.booked_by,
-            },
-        }
-    )
+    return jsonify({"message": "Booking updated successfully", "booking": _booking_json(booking)})
 
 
 @booking_bp.route("/api/bookings/<int:booking_id>", methods=["DELETE"])
@@ -404,6 +726,7 @@ def delete_booking(booking_id: int):
         return jsonify({"message": "Not authorized to cancel this booking"}), 403
 
     try:
+        showtimes.release_booking(booking)
         db.session.delete(booking)
         db.session.commit()
     except Exception as exc:
@@ -0,0 +1,48 @@
+from flask import Blueprint, jsonify, request, session
+
+from chatbot import embeddings, retrieval
+from models import Movie
+
+movie_bp = Blueprint("movie_api", __name__)
+
+MAX_SEARCH_RESULTS = 20
+
+
+@movie_bp.route("/api/movies/search", methods=["GET"])
+def search_catalog():
+    # Semantic search over the catalog; ?like=<imdb_id> finds movies similar to one movie
+    if not session.get("username"):
+        return jsonify({"message": "Login required"}), 401
+
+    query = (request.args.get("q") or "").strip()
+    like = (request.args.get("like") or "").strip() or None
+    if not query and not like:
+        return jsonify({"message": "q or like is required"}), 400
+    try:
+        k = max(1, min(MAX_SEARCH_RESULTS, int(request.args.get("k", "5"))))
+    except ValueError:
+        return jsonify({"message": "k must be an integer"}), 400
+
+    try:
+        ranked = [(imdb_id, score) for imdb_id, _, score in embeddings.search(query, k, like=like)]
+        mode = "semantic"
+    except embeddings.EmbeddingsUnavailable:
+        # Keyword ranking keeps search usable while the embedding model is down
+        ranked = retrieval.keyword_search(query, k, like=like)
+        mode = "keyword"
+
+    movies = {m.imdb_id: m for m in Movie.query.filter(Movie.imdb_id.in_([i for i, _ in ranked])).all()}
+    results = [
+        {
+            "imdb_id": imdb_id,
+            "title": movies[imdb_id].title,
+            "year": movies[imdb_id].year,
+            "poster": movies[imdb_id].poster,
+            "genre": movies[imdb_id].genre,
+            "rating": movies[imdb_id].rating,
+            "score": round(score, 4),
+        }
+        for imdb_id, score in ranked
+        if imdb_id in movies
+    ]
+    return jsonify({"query": query, "like": like, "mode": mode, "results": results})
@@ -0,0 +1,108 @@
+import hashlib
+import io
+import os
+import threading
+
+from flask import Blueprint, current_app, request
+
+import http_client
+from models import Movie
+from omdb import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it the original image is served
+    Image = None
+
+poster_bp = Blueprint("posters", __name__)
+
+POSTER_WIDTHS = (160, 320, 640)
+DEFAULT_POSTER_WIDTH = 320
+try:
+    POSTER_MAX_AGE_SECONDS = int(os.getenv("POSTER_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+except ValueError:
+    POSTER_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+_poster_flight = SingleFlight()
+
+
+def _cache_dir():
+    path = os.getenv("POSTER_CACHE_DIR") or os.path.join(current_app.instance_path, "posters")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _resize(original, width):
+    if Image is None:
+        return original
+    with Image.open(io.BytesIO(original)) as img:
+        img = img.convert("RGB")
+        if img.width > width:
+            img.thumbnail((width, width * 4))
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def _fetch_original(url, path):
+    # Each source image is downloaded once; every size is cut from the local copy
+    if not os.path.exists(path):
+        res = http_client.get(url)
+        res.raise_for_status()
+        _write_atomic(path, res.content)
+
+
+def _variant_name(movie, width):
+    # The source URL is part of the name so a changed poster never serves a stale file
+    source = hashlib.sha1(movie.poster.encode()).hexdigest()[:10]
+    return f"{movie.imdb_id}_{source}_{width}"
+
+
+def _build_variant(movie, width, path):
+    if os.path.exists(path):
+        return path
+
+    original_path = os.path.join(os.path.dirname(path), _variant_name(movie, "orig"))
+    _poster_flight.do(original_path, lambda: _fetch_original(movie.poster, original_path))
+    with open(original_path, "rb") as fh:
+        original = fh.read()
+
+    _write_atomic(path, _resize(original, width))
+    return path
+
+
+@poster_bp.route("/posters/<imdb_id>")
+def poster(imdb_id):
+    # Serve a resized, disk-cached copy of the movie poster
+    try:
+        width = int(request.args.get("w", DEFAULT_POSTER_WIDTH))
+    except ValueError:
+        width = DEFAULT_POSTER_WIDTH
+    # Snap to a known size so arbitrary widths cannot fill the disk
+    width = min(POSTER_WIDTHS, key=lambda w: abs(w - width))
+
+    movie = Movie.query.filter_by(imdb_id=imdb_id).first()
+    if not movie or not movie.poster or movie.poster == "N/A":
+        return "Poster not found", 404
+
+    path = os.path.join(_cache_dir(), _variant_name(movie, width) + ".jpg")
+    try:
+        _poster_flight.do(path, lambda: _build_variant(movie, width, path))
+    except Exception as exc:
+        print(f"Poster fetch failed for {imdb_id}:", exc)
+        return "Poster unavailable", 502
+
+    with open(path, "rb") as fh:
+        data = fh.read()
+    response = current_app.response_class(data, mimetype="image/jpeg")
+    response.set_etag(hashlib.sha1(data).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = POSTER_MAX_AGE_SECONDS
+    return response.make_conditional(request)
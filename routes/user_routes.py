@@ -1,6 +1,9 @@
-from flask import Blueprint, jsonify, session
+from flask import Blueprint, jsonify, request, session
 
-from models import Booking, User, db
+from models import Booking, SeatHold, User, db
+import holds
+import pagination
+import showtimes
 
 user_bp = Blueprint("user_api", __name__)
 
@@ -11,12 +14,21 @@ def list_users():
     if session.get("role") != "admin":
         return jsonify({"message": "Admin access required"}), 403
 
-    users = User.query.order_by(User.id.asc()).all()
+    # Users have no creation time; ids are assigned in sign-up order, so the cursor is the id alone
+    try:
+        limit = pagination.page_limit(request.args.get("limit"))
+        users, next_cursor = pagination.paginate(
+            User.query, [User.id], request.args.get("cursor"), limit, descending=False
+        )
+    except pagination.InvalidPage as exc:
+        return jsonify({"message": str(exc)}), 400
+
     payload = [
         {"id": user.id, "username": user.username, "role": user.role}
         for user in users
     ]
-    return jsonify({"users": payload})
+    total = pagination.cached_count("users", User.query)
+    return jsonify({"users": payload, "next_cursor": next_cursor, "total": total})
 
 
 @user_bp.route("/api/users/<int:user_id>", methods=["DELETE"])
@@ -30,9 +42,14 @@ def delete_user(user_id: int):
         return jsonify({"message": "User not found"}), 404
     
     try:
-        deleted_bookings = Booking.query.filter_by(booked_by=user.username).delete()
+        # Give the seats back before the bookings go
+        showtimes.release_bookings(Booking.query.filter_by(user_id=user.id).all())
+        for hold in SeatHold.query.filter_by(username=user.username, status="held").all():
+            holds.release(hold)
+        deleted_bookings = Booking.query.filter_by(user_id=user.id).delete()
         db.session.delete(user)
         db.session.commit()
+        pagination.invalidate_counts()
     except Exception as exc:
         db.session.rollback()
         return jsonify({"message": "Failed to delete user", "error": str(exc)}), 500
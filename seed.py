@@ -1,12 +1,17 @@
+import argparse
 import os
-import requests
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import bcrypt
+import omdb
 from app import app, db
-from models import User, Movie
+from chatbot import embeddings, knowledge
+from models import Booking, Movie, User
 from sqlalchemy import inspect, text
-from datetime import date, timedelta
-
-OMDB_API_KEY = "225f5d3d"
+from datetime import date, datetime, timedelta
 
 seed_titles = [
     "Wicked: For Good",
@@ -18,19 +23,46 @@ seed_titles = [
 
 expiration = date.today() + timedelta(days=90)   # 3 months in theaters
 
+try:
+    SEED_WORKERS = int(os.getenv("SEED_WORKERS", "8"))
+except ValueError:
+    SEED_WORKERS = 8
+
+# Columns added to movies after the first release, with their SQL types
+legacy_movie_columns = {
+    "expiration": "DATE",
+    "director": "VARCHAR(255)",
+    "production": "VARCHAR(255)",
+    "genre": "VARCHAR(255)",
+    "rating": "VARCHAR(10)",
+    "runtime": "VARCHAR(50)",
+    "actors": "VARCHAR(500)",
+    "plot": "TEXT",
+    "released": "VARCHAR(50)",
+    "refreshed_at": "DATETIME",
+}
+
+legacy_booking_columns = {
+    "idempotency_key": "VARCHAR(100)",
+    "checkout_session_id": "VARCHAR(255)",
+    "movie_id": "INTEGER REFERENCES movies (id)",
+    "user_id": "INTEGER REFERENCES users (id)",
+}
+
+# Formats seen in show_date before it became a DATE column
+legacy_date_formats = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
 def fetch_movie(title):
-    url = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&s={title}&type=movie"
-    data = requests.get(url).json()
+    data = omdb.search(title)
 
-    if not data or data.get("Response") == "False":
+    if not data or data.get("Response") == "False" or not data.get("Search"):
         return None
 
     # get first match
     first = data["Search"][0]
     
     # Now fetch full details using imdbID
-    detail_url = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&i={first['imdbID']}"
-    return requests.get(detail_url).json()
+    return omdb.get_movie(first["imdbID"], plot="full")
 
 
 def hash_password(password, pepper, salt=None):
@@ -39,19 +71,126 @@ def hash_password(password, pepper, salt=None):
     hashed = bcrypt.hashpw((password + pepper).encode(), salt)
     return hashed, salt
 
-with app.app_context():
-    # Ensure legacy databases have the expiration column
+
+@contextmanager
+def timed(stage, timings):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def read_titles(source):
+    """Titles from a file path, '-' for stdin, or the built-in list when source is None."""
+    if source is None:
+        return list(seed_titles)
+    lines = sys.stdin.read().splitlines() if source == "-" else open(source).read().splitlines()
+    titles = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in titles:
+            titles.append(line)
+    return titles
+
+
+def _fetch_in_context(title):
+    # Pool threads need their own app context for the OMDB cache
+    with app.app_context():
+        try:
+            return fetch_movie(title)
+        except Exception as exc:
+            print(f"Fetching '{title}' failed:", exc)
+            return None
+
+
+def fetch_movies(titles, workers):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(zip(titles, pool.map(_fetch_in_context, titles)))
+
+
+def migrate_legacy_columns():
+    # Bring legacy databases up to the current movie and booking columns
     inspector = inspect(db.engine)
     if inspector.has_table("movies"):
         cols = {col["name"] for col in inspector.get_columns("movies")}
-        if "expiration" not in cols:
-            # SQLite allows adding nullable columns via ALTER TABLE
+        for name, ddl in legacy_movie_columns.items():
+            if name not in cols:
+                # SQLite allows adding nullable columns via ALTER TABLE
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE movies ADD COLUMN {name} {ddl}"))
+    if inspector.has_table("movie_bookings"):
+        cols = {col["name"] for col in inspector.get_columns("movie_bookings")}
+        with db.engine.begin() as conn:
+            for name, ddl in legacy_booking_columns.items():
+                if name not in cols:
+                    conn.execute(text(f"ALTER TABLE movie_bookings ADD COLUMN {name} {ddl}"))
+        backfill_bookings()
+        normalize_booking_dates()
+
+    # ALTER TABLE cannot add UNIQUE columns, so unique and composite indexes are created separately
+    for model in (Movie, Booking):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def backfill_bookings():
+    # Point existing bookings at their catalog movie and account by title and username
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE movie_bookings SET movie_id = "
+            "(SELECT MIN(movies.id) FROM movies WHERE movies.title = movie_bookings.movie_title) "
+            "WHERE movie_id IS NULL"
+        ))
+        conn.execute(text(
+            "UPDATE movie_bookings SET user_id = "
+            "(SELECT users.id FROM users WHERE users.username = movie_bookings.booked_by) "
+            "WHERE user_id IS NULL"
+        ))
+        # Keyset pagination needs a created_at on every row
+        conn.execute(text("UPDATE movie_bookings SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+        if db.engine.dialect.name == "sqlite":
+            # CURRENT_TIMESTAMP has no fractional seconds; pad to the format SQLAlchemy compares against
+            conn.execute(text(
+                "UPDATE movie_bookings SET created_at = created_at || '.000000' "
+                "WHERE created_at NOT LIKE '%.%'"
+            ))
+
+
+def normalize_booking_dates():
+    # show_date used to be free text; store it as a DATE (ISO text on SQLite)
+    if db.engine.dialect.name != "sqlite":
+        column = next(col for col in inspect(db.engine).get_columns("movie_bookings") if col["name"] == "show_date")
+        if "DATE" not in str(column["type"]).upper():
             with db.engine.begin() as conn:
-                conn.execute(text("ALTER TABLE movies ADD COLUMN expiration DATE"))
+                conn.execute(text(
+                    "ALTER TABLE movie_bookings ALTER COLUMN show_date TYPE DATE USING show_date::date"
+                ))
+        return
 
-    # ------------------------------
-    # Seed Admin User
-    # ------------------------------
+    with db.engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, show_date FROM movie_bookings "
+            "WHERE show_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+        )).all()
+        for booking_id, value in rows:
+            parsed = None
+            for fmt in legacy_date_formats:
+                try:
+                    parsed = datetime.strptime(str(value).strip(), fmt).date()
+                    break
+                except ValueError:
+                    continue
+            if parsed is None:
+                print(f"Booking {booking_id} has an unreadable show_date {value!r}; fix it by hand")
+                continue
+            conn.execute(
+                text("UPDATE movie_bookings SET show_date = :show_date WHERE id = :id"),
+                {"show_date": parsed.isoformat(), "id": booking_id},
+            )
+
+
+def seed_admin():
     pepper = os.getenv("PEPPER")
     admin_username = os.getenv("ADMIN_USERNAME", "admin")
     admin_password = os.getenv("ADMIN_PASSWORD", "Admin123!")
@@ -70,21 +209,29 @@ with app.app_context():
     else:
         print("Admin user already exists")
 
-    # ------------------------------
-    # Seed Movies
-    # ------------------------------
-    for title in seed_titles:
-        data = fetch_movie(title)
-        imdb_id = data.get("imdbID")
-            
+
+def upsert_movies(fetched):
+    """Insert new movies and refresh details of existing ones; the caller commits once."""
+    found = {}
+    for title, data in fetched:
         # Skip invalid movies
-        if not data or data.get("Response") == "False":
+        if not data or data.get("Response") == "False" or not data.get("imdbID"):
             print(f"Skipping '{title}' — OMDB returned no results.")
             continue
-        
-        # Prevent duplicates
-        if Movie.query.filter_by(imdb_id=imdb_id).first():
-            print(f"Skipping {title} (already in DB)")
+        found.setdefault(data["imdbID"], (title, data))
+
+    # One query resolves every duplicate instead of one lookup per title
+    existing = {
+        m.imdb_id: m
+        for m in Movie.query.filter(Movie.imdb_id.in_(list(found))).all()
+    } if found else {}
+
+    added = 0
+    for imdb_id, (title, data) in found.items():
+        movie = existing.get(imdb_id)
+        if movie:
+            omdb.apply_details(movie, data)
+            print(f"Updated {title} (already in DB)")
             continue
 
         movie = Movie(
@@ -94,8 +241,53 @@ with app.app_context():
             poster=data.get("Poster"),
             expiration=expiration
         )
+        omdb.apply_details(movie, data)
         db.session.add(movie)
+        added += 1
         print(f"Added movie: {title}")
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the admin user and the movie catalog.")
+    parser.add_argument("--titles", default=os.getenv("SEED_TITLES_FILE"),
+                        help="file with one title per line, or '-' for stdin")
+    parser.add_argument("--workers", type=int, default=SEED_WORKERS,
+                        help="concurrent OMDB lookups")
+    args = parser.parse_args(argv)
+
+    timings = {}
+    with app.app_context():
+        with timed("migrate", timings):
+            migrate_legacy_columns()
+
+        # ------------------------------
+        # Seed Admin User
+        # ------------------------------
+        seed_admin()
+
+        # ------------------------------
+        # Seed Movies
+        # ------------------------------
+        titles = read_titles(args.titles)
+        with timed("fetch", timings):
+            fetched = fetch_movies(titles, args.workers)
+        with timed("upsert", timings):
+            upsert_movies(fetched)
+            db.session.commit()
+        with timed("knowledge", timings):
+            knowledge.sync_knowledge()
+        with timed("embeddings", timings):
+            try:
+                embeddings.sync_embeddings()
+            except embeddings.EmbeddingsUnavailable:
+                # Built on the first semantic search instead
+                db.session.rollback()
+                print("Embedding model unavailable; skipping movie embeddings")
 
-    db.session.commit()
     print("Seeding complete!")
+    print("Stage timings: " + ", ".join(f"{stage}={secs:.2f}s" for stage, secs in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
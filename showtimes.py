@@ -0,0 +1,127 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models import Movie, Showtime, db
+
+# Daily schedule for every movie; "available" is the seat capacity of each showing
+set_showtimes = [
+    {"time": "2:00 PM", "available": 15},
+    {"time": "5:30 PM", "available": 9},
+    {"time": "8:00 PM", "available": 20},
+]
+
+
+class SoldOut(Exception):
+    def __init__(self, remaining):
+        super().__init__(f"Only {remaining} seat(s) left")
+        self.remaining = remaining
+
+
+def capacity_for(show_time):
+    return next((s["available"] for s in set_showtimes if s["time"] == show_time), None)
+
+
+def parse_date(value):
+    if hasattr(value, "year"):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def availability(movie, show_date):
+    """Seats left per scheduled time for movie on show_date, without creating rows."""
+    show_date = parse_date(show_date)
+    rows = {}
+    if movie is not None and show_date is not None:
+        rows = {
+            row.show_time: row.remaining
+            for row in Showtime.query.filter_by(movie_id=movie.id, show_date=show_date).all()
+        }
+    return [
+        {"time": s["time"], "available": rows.get(s["time"], s["available"]), "capacity": s["available"]}
+        for s in set_showtimes
+    ]
+
+
+def find(movie_title, show_date, show_time, create=True, movie=None):
+    """Return the inventory row for a catalog movie's scheduled showing, or None.
+
+    Bookings for movies outside the catalog, or times off the schedule, are
+    not inventory-tracked. Rows are created on first use; creation commits
+    on its own, so call this before staging other changes. Pass movie when
+    the caller has already looked it up.
+    """
+    capacity = capacity_for(show_time)
+    show_date = parse_date(show_date)
+    if capacity is None or show_date is None:
+        return None
+    if movie is None:
+        movie = Movie.query.filter_by(title=movie_title).first()
+    if movie is None:
+        return None
+
+    slot = {"movie_id": movie.id, "show_date": show_date, "show_time": show_time}
+    row = Showtime.query.filter_by(**slot).first()
+    if row is not None or not create:
+        return row
+    try:
+        row = Showtime(capacity=capacity, remaining=capacity, **slot)
+        db.session.add(row)
+        db.session.commit()
+    except IntegrityError:
+        # Another worker created the same showing first
+        db.session.rollback()
+        row = Showtime.query.filter_by(**slot).first()
+    return row
+
+
+def reserve(row, quantity):
+    """Atomically take quantity seats from row (caller commits); raises SoldOut."""
+    result = db.session.execute(
+        db.update(Showtime)
+        .where(Showtime.id == row.id, Showtime.remaining >= quantity)
+        .values(remaining=Showtime.remaining - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(row, ["remaining"])
+    if result.rowcount != 1:
+        raise SoldOut(row.remaining)
+
+
+def release(row, quantity):
+    """Atomically give quantity seats back to row, never above capacity (caller commits)."""
+    restored = Showtime.remaining + quantity
+    db.session.execute(
+        db.update(Showtime)
+        .where(Showtime.id == row.id)
+        .values(remaining=db.case((restored > Showtime.capacity, Showtime.capacity), else_=restored))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expire(row, ["remaining"])
+
+
+def release_booking(booking):
+    """Return a booking's seats to its showing, if that showing is tracked (caller commits)."""
+    release_bookings([booking])
+
+
+def release_bookings(bookings):
+    """Return the seats of many bookings with one query and one UPDATE per showing (caller commits)."""
+    seats = {}
+    for booking in bookings:
+        if booking.movie_id is not None:
+            slot = (booking.movie_id, booking.show_date, booking.showtime)
+            seats[slot] = seats.get(slot, 0) + booking.quantity
+    if not seats:
+        return
+    rows = Showtime.query.filter(
+        Showtime.movie_id.in_({movie_id for movie_id, _, _ in seats}),
+        Showtime.show_date.in_({show_date for _, show_date, _ in seats}),
+    ).all()
+    for row in rows:
+        quantity = seats.get((row.movie_id, row.show_date, row.show_time))
+        if quantity:
+            release(row, quantity)
@@ -50,9 +50,10 @@ const initAdminPage = () => {
       }
       cardEl?.remove();
       const remaining = bookingList?.querySelectorAll('.booking-card').length ?? 0;
-      if (bookingCount) bookingCount.textContent = remaining;
+      if (bookingCount) bookingCount.textContent = Math.max(0, (Number(bookingCount.textContent) || 1) - 1);
       if (remaining === 0) {
-        clearAndSetEmpty(bookingList);
+        // Pull in the next page, or show the empty state
+        await fetchBookings();
       }
       setMessage('Booking deleted successfully.');
     } catch (error) {
@@ -82,9 +83,9 @@ const initAdminPage = () => {
       }
       cardEl?.remove();
       const remaining = userList?.querySelectorAll('.admin-user').length ?? 0;
-      if (userCount) userCount.textContent = remaining;
+      if (userCount) userCount.textContent = Math.max(0, (Number(userCount.textContent) || 1) - 1);
       if (remaining === 0) {
-        clearAndSetEmpty(userList);
+        await fetchUsers();
       }
       setMessage('User deleted successfully.');
       await fetchBookings();
@@ -177,6 +178,12 @@ const initAdminPage = () => {
     const actions = document.createElement('div');
     actions.className = 'booking-card__actions booking-card__actions--admin';
 
+    const select = document.createElement('input');
+    select.type = 'checkbox';
+    select.className = 'booking-card__select';
+    select.value = booking.id;
+    select.setAttribute('aria-label', `Select booking #${booking.id}`);
+
     const editLink = document.createElement('a');
     editLink.className = 'booking-card__button booking-card__button--edit';
     editLink.textContent = 'Edit Booking';
@@ -192,6 +199,7 @@ const initAdminPage = () => {
       await deleteBooking(booking.id, card);
     });
 
+    actions.appendChild(select);
     actions.appendChild(editLink);
     actions.appendChild(deleteBtn);
 
@@ -219,51 +227,126 @@ const initAdminPage = () => {
     items.forEach((item) => container.appendChild(createFn(item)));
   };
 
-  const fetchUsers = async () => {
-    try {
-      const response = await fetch('/api/users');
-      const data = await response.json().catch(() => ({}));
-      if (!response.ok) {
-        throw new Error(data.message || 'Failed to load users.');
+  // Lists are loaded a page at a time; "Load more" follows the server's cursor
+  const PAGE_SIZE = 50;
+
+  const createPagedList = ({ url, key, label, container, countEl, createFn }) => {
+    let cursor = null;
+    const moreBtn = document.createElement('button');
+    moreBtn.type = 'button';
+    moreBtn.className = 'admin-list__more';
+    moreBtn.textContent = 'Load more';
+    moreBtn.hidden = true;
+    container?.after(moreBtn);
+
+    const load = async (reset) => {
+      if (!container) return;
+      const params = new URLSearchParams({ limit: PAGE_SIZE });
+      if (!reset && cursor) {
+        params.set('cursor', cursor);
       }
+      moreBtn.disabled = true;
+      try {
+        const response = await fetch(`${url}?${params}`);
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) {
+          throw new Error(data.message || `Failed to load ${label}.`);
+        }
 
-      const users = data.users || [];
-      if (userCount) {
-        userCount.textContent = users.length;
-      }
-      renderList(userList, users, createUserCard);
-    } catch (error) {
-      console.error('Failed to load users', error);
-      setMessage(error.message || 'Unable to load users.');
-      if (userCount) {
-        userCount.textContent = '0';
+        const items = data[key] || [];
+        if (reset) {
+          renderList(container, items, createFn);
+        } else {
+          items.forEach((item) => container.appendChild(createFn(item)));
+        }
+        cursor = data.next_cursor || null;
+        moreBtn.hidden = !cursor;
+        if (countEl) {
+          countEl.textContent = data.total ?? items.length;
+        }
+      } catch (error) {
+        console.error(`Failed to load ${label}`, error);
+        setMessage(error.message || `Unable to load ${label}.`);
+        if (reset) {
+          if (countEl) {
+            countEl.textContent = '0';
+          }
+          clearAndSetEmpty(container);
+          moreBtn.hidden = true;
+        }
+      } finally {
+        moreBtn.disabled = false;
       }
-      clearAndSetEmpty(userList);
-    }
+    };
+
+    moreBtn.addEventListener('click', () => load(false));
+    return () => load(true);
   };
 
-  const fetchBookings = async () => {
+  const fetchUsers = createPagedList({
+    url: '/api/users',
+    key: 'users',
+    label: 'users',
+    container: userList,
+    countEl: userCount,
+    createFn: createUserCard,
+  });
+
+  const fetchBookings = createPagedList({
+    url: '/api/bookings',
+    key: 'bookings',
+    label: 'bookings',
+    container: bookingList,
+    countEl: bookingCount,
+    createFn: createBookingCard,
+  });
+
+  // Checked bookings are cancelled together in one request
+  const deleteSelectedBtn = document.createElement('button');
+  deleteSelectedBtn.type = 'button';
+  deleteSelectedBtn.className = 'admin-list__more admin-list__bulk';
+  deleteSelectedBtn.textContent = 'Delete selected';
+  bookingList?.before(deleteSelectedBtn);
+
+  deleteSelectedBtn.addEventListener('click', async () => {
+    const selected = [...(bookingList?.querySelectorAll('.booking-card__select:checked') || [])];
+    if (selected.length === 0) {
+      setMessage('Select bookings to delete first.');
+      return;
+    }
+    if (!window.confirm(`Delete ${selected.length} booking(s)?`)) return;
+
+    deleteSelectedBtn.disabled = true;
     try {
-      const response = await fetch('/api/bookings');
+      const response = await fetch('/api/bookings/batch-cancel', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ booking_ids: selected.map((el) => Number(el.value)) })
+      });
       const data = await response.json().catch(() => ({}));
       if (!response.ok) {
-        throw new Error(data.message || 'Failed to load bookings.');
+        throw new Error(data.message || 'Failed to delete bookings.');
       }
 
-      const bookings = data.bookings || [];
+      (data.results || [])
+        .filter((result) => result.status === 200)
+        .forEach((result) => {
+          bookingList.querySelector(`.booking-card__select[value="${result.booking_id}"]`)?.closest('.booking-card')?.remove();
+        });
       if (bookingCount) {
-        bookingCount.textContent = bookings.length;
+        bookingCount.textContent = Math.max(0, (Number(bookingCount.textContent) || 0) - (data.cancelled || 0));
       }
-      renderList(bookingList, bookings, createBookingCard);
-    } catch (error) {
-      console.error('Failed to load bookings', error);
-      setMessage(error.message || 'Unable to load bookings.');
-      if (bookingCount) {
-        bookingCount.textContent = '0';
+      if (!bookingList.querySelector('.booking-card')) {
+        await fetchBookings();
       }
-      clearAndSetEmpty(bookingList);
+      setMessage(`${data.cancelled || 0} booking(s) deleted.`);
+    } catch (error) {
+      console.error('Failed to delete bookings', error);
+      setMessage(error.message || 'Unable to delete bookings.');
+    } finally {
+      deleteSelectedBtn.disabled = false;
     }
-  };
+  });
 
   fetchUsers();
   fetchBookings();
@@ -348,6 +431,7 @@ const initBookingForm = () => {
   const currentUser = bookingDataEl.dataset.currentUser || '';
   const existingBooking = safeParseJSON(bookingDataEl.dataset.existingBooking) || null;
   const movieTitle = bookingDataEl.dataset.movieTitle || '';
+  const movieId = bookingDataEl.dataset.movieId || '';
   const isEditMode = Boolean(existingBooking && existingBooking.id);
 
   let selectedShowtime = null;
@@ -367,6 +451,27 @@ const initBookingForm = () => {
     });
   });
 
+  // Refresh seats left for each showtime when the date changes
+  async function refreshAvailability() {
+    if (!movieId || !dateInput.value) return;
+    try {
+      const response = await fetch(`/api/showtimes?movie=${encodeURIComponent(movieId)}&date=${dateInput.value}`);
+      if (!response.ok) return;
+      const data = await response.json();
+      data.showtimes.forEach(show => {
+        const btn = Array.from(document.querySelectorAll('.booking-form__showtime')).find(b => b.dataset.time === show.time);
+        if (!btn) return;
+        btn.dataset.available = show.available;
+        const seats = btn.querySelector('.booking-form__seats');
+        if (seats) seats.textContent = `(${show.available} left)`;
+        btn.disabled = show.available <= 0 && !(isEditMode && existingBooking.showtime === show.time);
+      });
+    } catch (err) {
+      console.error(err);
+    }
+  }
+  dateInput.addEventListener('change', refreshAvailability);
+
   if (isEditMode) {
     confirmBtn.textContent = 'Update Booking';
     if (existingBooking.show_date) {
@@ -503,6 +608,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
   if (!toggleBtn) return; // ensures this only runs on home.html
 
+  // Give up on a chat job that has not finished by then (a restarted worker drops its queue)
+  const CHAT_POLL_DEADLINE_MS = 90000;
+
   function appendMessage(text, sender) {
     const div = document.createElement("div");
     div.classList.add("movie-chatbot__message");
@@ -538,6 +646,17 @@ document.addEventListener('DOMContentLoaded', () => {
     const thinking = appendMessage("Thinking...", "bot");
 
     try {
+      // Render tokens as they arrive where the browser can read a stream; poll a chat job otherwise
+      if (window.CHAT_STREAM_URL && window.ReadableStream) {
+        await streamReply(text, thinking);
+        return;
+      }
+
+      if (window.CHAT_JOBS_URL) {
+        await pollReply(text, thinking);
+        return;
+      }
+
       const resp = await fetch(window.CHAT_URL, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
@@ -546,12 +665,102 @@ document.addEventListener('DOMContentLoaded', () => {
 
       const data = await resp.json();
       thinking.textContent =
-        data.reply || "Sorry, I didn't understand that.";
+        data.reply || data.error || "Sorry, I didn't understand that.";
     } catch (err) {
       console.error(err);
       thinking.textContent =
         "Error contacting the movie assistant.";
     }
   });
+
+  // Render Server-Sent Events from the streaming endpoint token by token
+  async function streamReply(text, bubble) {
+    const resp = await fetch(window.CHAT_STREAM_URL, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ message: text }),
+    });
+    if (resp.status === 503) {
+      const data = await resp.json();
+      bubble.textContent = data.error;
+      return;
+    }
+    if (!resp.ok || !resp.body) {
+      throw new Error(`Chat stream failed with status ${resp.status}`);
+    }
+
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let reply = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
+
+        if (rawEvent.startsWith("event: done")) continue;
+        const dataLine = rawEvent.split("\n").find((line) => line.startsWith("data: "));
+        const payload = safeParseJSON(dataLine ? dataLine.slice(6) : "");
+        if (payload && payload.token) {
+          reply += payload.token;
+          bubble.textContent = reply;
+          messagesEl.scrollTop = messagesEl.scrollHeight;
+        }
+      }
+    }
+
+    if (!reply) {
+      bubble.textContent = "Sorry, I didn't understand that.";
+    }
+  }
+
+  // Submit a chat job and poll it, rendering the partial reply as it grows
+  async function pollReply(text, bubble) {
+    const resp = await fetch(window.CHAT_JOBS_URL, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ message: text }),
+    });
+    const job = await resp.json();
+    if (!resp.ok) {
+      bubble.textContent = job.error || "Error contacting the movie assistant.";
+      return;
+    }
+    // Catalog and cached answers come back straight away with nothing to poll
+    if (job.done) {
+      bubble.textContent = job.reply || "Sorry, I didn't understand that.";
+      return;
+    }
+
+    const deadline = Date.now() + CHAT_POLL_DEADLINE_MS;
+    while (true) {
+      if (Date.now() > deadline) {
+        bubble.textContent = "The movie assistant is taking too long, please try again.";
+        return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500));
+      const statusResp = await fetch(job.status_url);
+      const data = await statusResp.json();
+      if (!statusResp.ok) {
+        throw new Error(`Chat job failed with status ${statusResp.status}`);
+      }
+      if (data.reply) {
+        bubble.textContent = data.reply;
+        messagesEl.scrollTop = messagesEl.scrollHeight;
+      }
+      if (data.done) break;
+    }
+
+    if (!bubble.textContent || bubble.textContent === "Thinking...") {
+      bubble.textContent = "Sorry, I didn't understand that.";
+    }
+  }
 })();
 
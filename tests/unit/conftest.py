@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-jwt")
+os.environ.setdefault("PEPPER", "test-pepper")
+os.environ.setdefault("OLLAMA_WARMUP", "0")
+os.environ.setdefault("SEMANTIC_SEARCH", "0")
+os.environ.setdefault("SEAT_HOLD_SWEEP_SECONDS", "0")
+# Always a file database, even when CI exports an in-memory URL: the engine is built from this
+# when app is imported, and in-memory SQLite would make every worker thread share one connection
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/unit.db"
+
+
+@event.listens_for(Engine, "connect")
+def _fast_sqlite(dbapi_connection, connection_record):
+    # Test databases are throwaway; skip fsyncs so create/drop per test stays quick
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.close()
+
+
+@pytest.fixture()
+def app_ctx():
+    from app import app, db
+
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def admin_client(app_ctx):
+    from flask_jwt_extended import create_access_token
+
+    client = app_ctx.test_client()
+    client.set_cookie("access_token_cookie", create_access_token(identity="admin"))
+    with client.session_transaction() as sess:
+        sess["username"] = "admin"
+        sess["role"] = "admin"
+    return client
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import catalog
+from models import Movie, db
+
+DETAILS = {
+    "Title": "Arrival",
+    "Director": "Denis Villeneuve",
+    "Production": "Paramount",
+    "Genre": "Drama, Sci-Fi",
+    "imdbRating": "7.9",
+    "Runtime": "116 min",
+    "Actors": "Amy Adams, Jeremy Renner",
+    "Plot": "A linguist works with the military.",
+    "Released": "11 Nov 2016",
+    "Response": "True",
+}
+
+
+@pytest.fixture()
+def omdb_calls(monkeypatch):
+    calls = []
+
+    def fake_get_movie(imdb_id, plot="short", refresh=False):
+        calls.append((imdb_id, refresh))
+        return DETAILS
+
+    monkeypatch.setattr(catalog.omdb, "get_movie", fake_get_movie)
+    return calls
+
+
+# the detail record is captured when an admin adds a movie
+def test_add_movie_stores_full_details(admin_client, omdb_calls):
+    response = admin_client.post(
+        "/admin/add-movie",
+        json={"imdb_id": "tt2543164", "title": "Arrival", "year": "2016", "poster": "poster.jpg"},
+    )
+    assert response.status_code == 200
+    movie = Movie.query.filter_by(imdb_id="tt2543164").first()
+    assert movie.director == "Denis Villeneuve"
+    assert movie.runtime == "116 min"
+    assert movie.refreshed_at is not None
+
+
+# stored details render the detail page without calling OMDB
+def test_movie_detail_served_from_database(admin_client, omdb_calls):
+    movie = Movie(imdb_id="tt2543164", title="Arrival", year="2016", poster="poster.jpg")
+    catalog.omdb.apply_details(movie, DETAILS)
+    db.session.add(movie)
+    db.session.commit()
+
+    response = admin_client.get("/movie/tt2543164")
+    assert response.status_code == 200
+    assert b"Denis Villeneuve" in response.data
+    assert omdb_calls == []
+
+
+# only movies past their max age are re-fetched, bypassing the cache
+def test_refresh_stale_movies(app_ctx, omdb_calls):
+    fresh = Movie(imdb_id="tt1", title="Fresh", year="2025", poster="p", refreshed_at=datetime.now())
+    stale = Movie(
+        imdb_id="tt2", title="Stale", year="2025", poster="p",
+        refreshed_at=datetime.now() - timedelta(days=3),
+    )
+    db.session.add_all([fresh, stale])
+    db.session.commit()
+
+    assert catalog.refresh_stale_movies(max_age=86400) == 1
+    assert omdb_calls == [("tt2", True)]
+    assert Movie.query.filter_by(imdb_id="tt2").first().genre == "Drama, Sci-Fi"
+
+
+# seeding skips failed lookups and is idempotent across runs
+def test_seed_upsert_is_idempotent(app_ctx):
+    import seed
+
+    fetched = [("Arrival", {**DETAILS, "imdbID": "tt2543164", "Year": "2016", "Poster": "p"}), ("Missing", None)]
+    assert seed.upsert_movies(fetched) == 1
+    db.session.commit()
+    assert seed.upsert_movies(fetched) == 0
+    db.session.commit()
+    assert Movie.query.count() == 1
@@ -0,0 +1,454 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from chatbot import answer_cache, chatbot_logic, conversation, jobs, knowledge, retrieval
+from models import KnowledgeEntry, Movie, db
+
+
+@pytest.fixture()
+def catalog(app_ctx, monkeypatch):
+    monkeypatch.setattr(knowledge, "_corpus", (None, None, None))
+    db.session.add_all(
+        [
+            Movie(imdb_id="tt0000001", title="Fast Movie", year="2025", poster="p1"),
+            Movie(imdb_id="tt0000002", title="Slow Movie", year="2025", poster="p2"),
+        ]
+    )
+    db.session.commit()
+    return app_ctx
+
+
+# movies whose OMDB fetch misses the deadline degrade to the limited line
+def test_knowledge_degrades_past_deadline(catalog, monkeypatch):
+    release = threading.Event()
+
+    def fake_get_movie(imdb_id, plot="short"):
+        if imdb_id == "tt0000002":
+            release.wait(2)
+        return {"Genre": "Drama", "Actors": "A. Actor", "Plot": "Things happen.", "imdbRating": "7.0"}
+
+    monkeypatch.setattr(knowledge.omdb, "get_movie", fake_get_movie)
+    monkeypatch.setattr(knowledge, "KNOWLEDGE_DEADLINE_SECONDS", 0.2)
+    try:
+        corpus = knowledge.get_snapshot()[2]
+    finally:
+        release.set()
+
+    lines = corpus.splitlines()
+    assert lines[0].startswith("Title: Fast Movie. Genre: Drama.")
+    assert lines[1] == "Title: Slow Movie. Limited info available."
+
+
+def _fake_details(imdb_id, plot="short"):
+    return {"Genre": "Drama", "Actors": "A. Actor", "Plot": f"Plot of {imdb_id}.", "imdbRating": "7.0"}
+
+
+# chat reads reuse the materialized corpus until the catalog version changes
+def test_corpus_is_rebuilt_only_for_changed_movies(catalog, monkeypatch):
+    fetched = []
+
+    def fake_get_movie(imdb_id, plot="short"):
+        fetched.append(imdb_id)
+        return _fake_details(imdb_id)
+
+    monkeypatch.setattr(knowledge.omdb, "get_movie", fake_get_movie)
+
+    corpus = knowledge.get_snapshot()[2]
+    assert "Plot of tt0000001." in corpus and "Plot of tt0000002." in corpus
+    assert knowledge.current_version() == 1
+    assert knowledge.get_snapshot()[2] is corpus
+    assert sorted(fetched) == ["tt0000001", "tt0000002"]
+
+    db.session.add(Movie(imdb_id="tt0000003", title="New Movie", year="2025", poster="p3"))
+    Movie.query.filter_by(imdb_id="tt0000001").delete()
+    db.session.commit()
+    assert knowledge.sync_knowledge() is True
+
+    corpus = knowledge.get_snapshot()[2]
+    assert knowledge.current_version() == 2
+    assert "Plot of tt0000003." in corpus
+    assert "Fast Movie" not in corpus
+    assert sorted(fetched) == ["tt0000001", "tt0000002", "tt0000003"]
+    assert KnowledgeEntry.query.count() == 2
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._lines = [json.dumps(c).encode() for c in chunks]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+
+# the streaming endpoint relays Ollama tokens as Server-Sent Events
+def test_chat_stream_relays_tokens(admin_client, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(retrieval, "select_context", lambda question, **kwargs: "Title: Arrival.")
+    sent = {}
+
+    def fake_post(url, json=None, **kwargs):
+        sent.update(json)
+        return FakeStream([{"response": "Arrival "}, {"response": "is playing."}, {"done": True}])
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    response = admin_client.post("/api/chat/stream", json={"message": "Recommend something for tonight"})
+
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    tokens = [json.loads(line[6:])["token"] for line in body.splitlines() if line.startswith("data: {\"token")]
+    # Tokens are relayed from the chat job as they are published, possibly batched
+    assert "".join(tokens) == "Arrival is playing."
+    assert body.rstrip().endswith("event: done\ndata: {}")
+    assert sent["stream"] is True
+    assert "Title: Arrival." in sent["prompt"]
+
+
+# only the most relevant summaries are sent, behind a list of every title
+def test_select_context_ranks_relevant_movies(monkeypatch):
+
+    entries = [
+        ("Black Phone 2", "Title: Black Phone 2. Genre: Horror, Thriller. Actors: Ethan Hawke. Plot: Calls from the dead."),
+        ("Zootopia 2", "Title: Zootopia 2. Genre: Animation, Comedy. Actors: Ginnifer Goodwin. Plot: A reptile mystery."),
+        ("Wicked: For Good", "Title: Wicked: For Good. Genre: Musical. Actors: Cynthia Erivo. Plot: Oz turns on a witch."),
+    ]
+    monkeypatch.setattr(knowledge, "get_snapshot", lambda: (7, entries, "\n".join(s for _, s in entries)))
+    monkeypatch.setattr(retrieval, "_index", (None, None))
+
+    context = retrieval.select_context("any good horror movies with Ethan Hawke?", top_k=1)
+    lines = context.splitlines()
+    assert lines[0] == "Now showing: Black Phone 2; Zootopia 2; Wicked: For Good"
+    assert lines[1:] == [entries[0][1]]
+
+    tight = retrieval.select_context("horror", top_k=3, token_budget=20)
+    assert entries[0][1] not in tight
+
+
+def FakeReply(text):
+    return FakeStream([{"response": text}, {"done": True}])
+
+
+def _ask(question, username=None):
+    # Job workers run stream_movie_bot; joined, it is the whole reply
+    return "".join(chatbot_logic.stream_movie_bot(question, username))
+
+
+# repeated questions are answered from the cache until the catalog changes
+def test_answer_cache_hits_and_invalidates(catalog, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(knowledge.omdb, "get_movie", _fake_details)
+    prompts = []
+
+    def fake_post(url, json=None, **kwargs):
+        prompts.append(json["prompt"])
+        return FakeReply(f"Reply {len(prompts)}")
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    before = answer_cache.stats()
+
+    assert _ask("What horror movies are playing?") == "Reply 1"
+    assert _ask("what HORROR movies are playing") == "Reply 1"
+    assert len(prompts) == 1
+    after = answer_cache.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+    db.session.add(Movie(imdb_id="tt0000003", title="Scary Movie", year="2025", poster="p3"))
+    db.session.commit()
+    knowledge.sync_knowledge()
+    assert _ask("What horror movies are playing?") == "Reply 2"
+
+
+# chat jobs return 202 at once, then expose the reply for polling by their owner only
+def test_chat_job_submit_and_poll(admin_client, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(retrieval, "select_context", lambda question, **kwargs: "Title: Arrival.")
+    release = threading.Event()
+    sent = {}
+
+    def fake_post(url, json=None, **kwargs):
+        sent.update(json)
+        release.wait(5)
+        return FakeStream([{"response": "Arrival is playing."}, {"done": True}])
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    before = answer_cache.stats()
+    response = admin_client.post("/api/chat/jobs", json={"message": "Recommend something for tonight"})
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    assert admin_client.get(status_url).get_json()["done"] is False
+
+    release.set()
+    for _ in range(50):
+        data = admin_client.get(status_url).get_json()
+        if data["done"]:
+            break
+        time.sleep(0.05)
+    assert data["status"] == "done"
+    assert data["reply"] == "Arrival is playing."
+    assert "Title: Arrival." in sent["prompt"]
+    # The worker reuses the web thread's cache lookup instead of missing a second time
+    assert answer_cache.stats()["misses"] - before["misses"] == 1
+
+    from flask_jwt_extended import create_access_token
+    admin_client.set_cookie("access_token_cookie", create_access_token(identity="someone-else"))
+    assert admin_client.get(status_url).status_code == 404
+
+
+# followers in the same process get tokens from the worker directly, not by polling the row
+def test_chat_job_tokens_are_handed_over_in_memory(admin_client, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(retrieval, "select_context", lambda question, **kwargs: "Title: Arrival.")
+    monkeypatch.setattr(jobs, "CHAT_JOB_FLUSH_SECONDS", 60)
+    monkeypatch.setattr(jobs, "CHAT_JOB_POLL_SECONDS", 60)
+
+    def fake_post(url, json=None, **kwargs):
+        return FakeStream([{"response": "Arrival "}, {"response": "is playing."}, {"done": True}])
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    started = time.monotonic()
+    response = admin_client.post("/api/chat", json={"message": "Recommend something for tonight"})
+    assert response.get_json() == {"reply": "Arrival is playing."}
+    assert time.monotonic() - started < 5
+
+
+# a full queue sheds load with 503 and Retry-After
+def test_chat_job_queue_full_returns_503(admin_client, monkeypatch):
+    def full(username, message, plan=None):
+        raise jobs.QueueFull()
+
+    monkeypatch.setattr(jobs, "submit", full)
+    response = admin_client.post("/api/chat/jobs", json={"message": "Hi"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+# catalog and cached answers are returned by the web thread without queueing a job
+def test_chat_answers_quick_replies_inline(admin_client, monkeypatch):
+    answer_cache.clear()
+    db.session.add(Movie(imdb_id="tt0000003", title="Arrival", year="2016", poster="p", rating="7.9"))
+    db.session.commit()
+    answer_cache.store(answer_cache.key_for("Recommend something for tonight"), "Try Arrival.")
+
+    def no_job(username, message, plan=None):
+        raise AssertionError("quick replies should not be queued")
+
+    monkeypatch.setattr(jobs, "submit", no_job)
+    data = admin_client.post("/api/chat/jobs", json={"message": "What is the rating of Arrival?"}).get_json()
+    assert data == {"status": "done", "reply": "Arrival is rated 7.9/10 on IMDb.", "done": True}
+    data = admin_client.post("/api/chat", json={"message": "recommend something for TONIGHT"}).get_json()
+    assert data == {"reply": "Try Arrival."}
+    body = admin_client.post("/api/chat/stream", json={"message": "Rating of Arrival"}).get_data(as_text=True)
+    assert "Arrival is rated 7.9/10" in body and body.rstrip().endswith("event: done\ndata: {}")
+
+
+# metadata questions are answered from the catalog without calling Ollama
+def test_structured_questions_skip_the_llm(app_ctx, monkeypatch):
+    db.session.add_all(
+        [
+            Movie(imdb_id="tt0000003", title="Black Phone", year="2021", poster="p", rating="6.9"),
+            Movie(
+                imdb_id="tt0000004", title="Black Phone 2", year="2025", poster="p",
+                rating="6.4", actors="Ethan Hawke, Mason Thames", runtime="114 min", genre="Horror",
+            ),
+        ]
+    )
+    db.session.commit()
+
+    def no_llm(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", no_llm)
+    assert _ask("What is the rating of Black Phone 2?") == "Black Phone 2 is rated 6.4/10 on IMDb."
+    assert _ask("Who stars in black phone 2") == "Black Phone 2 stars Ethan Hawke, Mason Thames."
+    assert _ask("How long is Black Phone 2?") == "Black Phone 2 runs 114 min."
+    assert _ask("Who is in Black Phone?") == "I don't have the cast for Black Phone."
+    assert _ask("What's playing?") == "Now showing: Black Phone, Black Phone 2."
+    assert "2:00 PM" in _ask("Showtimes for Black Phone")
+
+    assert chatbot_logic.quick_reply("Is Black Phone 2 scarier than the first one?")[0] is None
+    # questions about movies in general, not a listing, go to the LLM
+    assert chatbot_logic.quick_reply("What movies star Ethan Hawke?")[0] is None
+    assert chatbot_logic.quick_reply("Which movies are rated above 7?")[0] is None
+    assert chatbot_logic.quick_reply("Which movies have the best rating?")[0] is None
+
+
+# generations beyond the concurrency cap wait for a slot, then give up with a busy reply
+def test_generation_slots_cap_concurrency(catalog, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(chatbot_logic, "_generation_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(chatbot_logic, "OLLAMA_QUEUE_TIMEOUT", 0.05)
+    monkeypatch.setattr(knowledge.omdb, "get_movie", _fake_details)
+    sent = {}
+
+    def fake_post(url, json=None, **kwargs):
+        sent.update(json)
+        return FakeReply("Try Fast Movie.")
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    with chatbot_logic.generation_slot():
+        assert _ask("Anything fun tonight?") == chatbot_logic.BUSY_REPLY
+    assert _ask("Anything fun tonight?") == "Try Fast Movie."
+    assert sent["keep_alive"] == chatbot_logic.OLLAMA_KEEP_ALIVE
+    assert chatbot_logic.ollama_stats()["in_flight"] == 0
+
+
+# follow-ups resolve "its" to the last movie discussed and carry recent turns into the prompt
+def test_follow_up_questions_use_conversation_memory(catalog, monkeypatch):
+    answer_cache.clear()
+    monkeypatch.setattr(knowledge.omdb, "get_movie", _fake_details)
+    fast = Movie.query.filter_by(title="Fast Movie").first()
+    fast.runtime = "95 min"
+    fast.rating = "7.1"
+    db.session.commit()
+    prompts = []
+
+    def fake_post(url, json=None, **kwargs):
+        prompts.append(json["prompt"])
+        return FakeReply("It is a fun ride.")
+
+    monkeypatch.setattr(chatbot_logic.http_client, "post", fake_post)
+    assert _ask("What is the rating of Fast Movie?", "alice") == "Fast Movie is rated 7.1/10 on IMDb."
+    assert _ask("What about its runtime?", "alice") == "Fast Movie runs 95 min."
+    # another user has no history to resolve "its" against
+    assert _ask("What about its runtime?", "bob") == "It is a fun ride."
+
+    # pronouns that do not point back at the last movie start a fresh question
+    for question in ("Any movies that Emma Stone is in?", "Are they showing anything scary?", "Is her new film out?"):
+        assert not conversation.is_follow_up(answer_cache.normalize(question))
+    assert conversation.is_follow_up(answer_cache.normalize("Is that one any good?"))
+
+    _ask("Is it good for kids?", "alice")
+    assert "Conversation so far:" in prompts[-1]
+    assert "User: What about its runtime?" in prompts[-1]
+    assert "Conversation so far:" not in prompts[0]
+
+
+# only the last CHAT_MEMORY_TURNS turns are kept verbatim; older ones are folded into a summary
+def test_conversation_memory_is_bounded(app_ctx, monkeypatch):
+    monkeypatch.setattr(conversation, "CHAT_MEMORY_TURNS", 2)
+    for i in range(5):
+        conversation.record("alice", f"Question {i} " + "x" * 1000, f"Answer {i}")
+
+    memory = conversation.load("alice")
+    assert [t["a"] for t in memory.turns] == ["Answer 3", "Answer 4"]
+    assert len(memory.turns[0]["q"]) <= conversation.MAX_QUESTION_CHARS
+    assert "Answer 0" in memory.summary and len(memory.summary) <= conversation.MAX_SUMMARY_CHARS
+
+    monkeypatch.setattr(conversation, "CHAT_MEMORY_TTL_SECONDS", -1)
+    assert not conversation.load("alice")
+
+
+# the fake Ollama streams the configured number of tokens, and the bench reports percentiles
+def test_fake_ollama_and_bench_percentiles(monkeypatch):
+    from perf import chat_bench, fake_ollama
+
+    options = fake_ollama.build_parser().parse_args(["--port", "0", "--latency-ms", "0", "--tokens-per-second", "0", "--reply-tokens", "3"])
+    server = fake_ollama.start(options)
+    monkeypatch.setattr(chatbot_logic, "OLLAMA_URL", f"http://127.0.0.1:{server.server_port}")
+    try:
+        with chatbot_logic.generate("Hello", stream=True) as res:
+            chunks = [json.loads(line) for line in res.iter_lines() if line]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len([c for c in chunks if c["response"]]) == 3
+    assert chunks[-1]["done"] is True
+    assert chat_bench.summarize([float(n) for n in range(1, 101)])["p95"] == 95.0
+
+
+class FakeEmbeddings:
+    """Stands in for Ollama /api/embed with perf/fake_ollama's hashed vectors."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, url, json=None, **kwargs):
+        from perf.fake_ollama import fake_embedding
+
+        self.batches.append(list(json["input"]))
+        return FakeEmbedReply([fake_embedding(text) for text in json["input"]])
+
+
+class FakeEmbedReply:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"embeddings": self.vectors}
+
+
+@pytest.fixture()
+def semantic(app_ctx, monkeypatch):
+    from chatbot import embeddings
+
+    monkeypatch.setattr(embeddings, "SEMANTIC_SEARCH", True)
+    monkeypatch.setattr(embeddings, "_index", (None, [], None))
+    embeddings.breaker.reset()
+    embeddings._query_vectors.clear()
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(embeddings.http_client, "post", fake)
+    db.session.add_all(
+        [
+            Movie(imdb_id="tt0000011", title="Predator: Badlands", year="2025", poster="p", refreshed_at=datetime.now(),
+                  genre="Action, Sci-Fi", plot="A young predator hunts across an alien planet."),
+            Movie(imdb_id="tt0000012", title="Zootopia 2", year="2025", poster="p", refreshed_at=datetime.now(),
+                  genre="Animation, Comedy", plot="Two animal cops chase a snake through the city."),
+            Movie(imdb_id="tt0000013", title="Alien Hunt", year="2025", poster="p", refreshed_at=datetime.now(),
+                  genre="Action, Sci-Fi", plot="Soldiers hunt an alien on a distant planet."),
+        ]
+    )
+    db.session.commit()
+    # Details count as fetched, so the knowledge sync never calls the real OMDB in the background
+    knowledge.sync_knowledge()
+    return fake
+
+
+# vectors are ranked by cosine similarity and only recomputed when metadata changes
+def test_semantic_search_embeds_only_changed_movies(semantic):
+    from chatbot import embeddings
+
+    results = embeddings.search("alien planet hunt", k=2)
+    assert {title for _, title, _ in results} == {"Predator: Badlands", "Alien Hunt"}
+    assert embeddings.search("", k=1, like="tt0000011")[0][1] == "Alien Hunt"
+    assert len(semantic.batches[0]) == 3
+
+    movie = Movie.query.filter_by(imdb_id="tt0000012").first()
+    movie.plot = "Two animal cops go undercover at a reptile festival."
+    db.session.commit()
+    assert embeddings.sync_embeddings() == 1
+    assert embeddings.sync_embeddings() == 0
+
+
+# the search API reports semantic results, and falls back to keywords when embeddings fail
+def test_movie_search_api_falls_back_to_keywords(semantic, admin_client, monkeypatch):
+    from chatbot import embeddings
+
+    data = admin_client.get("/api/movies/search?q=alien planet&k=2").get_json()
+    assert data["mode"] == "semantic"
+    assert len(data["results"]) == 2
+
+    def down(url, json=None, **kwargs):
+        raise ConnectionError("no ollama")
+
+    monkeypatch.setattr(embeddings.http_client, "post", down)
+    embeddings._query_vectors.clear()
+    data = admin_client.get("/api/movies/search?q=animal cops").get_json()
+    assert data["mode"] == "keyword"
+    assert data["results"][0]["title"] == "Zootopia 2"
@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+
+
+# connection errors on GET are retried and every attempt is timed
+def test_get_retries_connection_errors(monkeypatch, no_sleep):
+    outcomes = [requests.ConnectionError("reset"), FakeResponse(200)]
+    timings = []
+
+    def fake_request(method, url, **kwargs):
+        assert kwargs["timeout"] == (http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    hook = lambda method, url, elapsed, status, error: timings.append((method, url, status, error))
+    monkeypatch.setattr(http_client.session, "request", fake_request)
+    http_client.add_timing_hook(hook)
+    try:
+        response = http_client.get("http://example.test/path?apikey=secret")
+    finally:
+        http_client.remove_timing_hook(hook)
+
+    assert response.status_code == 200
+    assert [t[2] for t in timings] == [None, 200]
+    assert all(t[1] == "http://example.test/path" for t in timings)
+
+
+# POST is not retried unless the caller asks for it
+def test_post_is_not_retried_by_default(monkeypatch, no_sleep):
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(method)
+        raise requests.Timeout("slow")
+
+    monkeypatch.setattr(http_client.session, "request", fake_request)
+    with pytest.raises(requests.Timeout):
+        http_client.post("http://example.test/api/generate", json={})
+    assert calls == ["POST"]
+
+
+# retryable statuses give up after the retry budget and return the last response
+def test_retry_budget_is_bounded(monkeypatch, no_sleep):
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(method)
+        return FakeResponse(503)
+
+    monkeypatch.setattr(http_client.session, "request", fake_request)
+    response = http_client.get("http://example.test/", retries=2)
+    assert response.status_code == 503
+    assert len(calls) == 3
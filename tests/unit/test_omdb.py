@@ -0,0 +1,231 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import omdb
+from models import Movie, OmdbCacheEntry, db
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture()
+def upstream(app_ctx, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(params)
+        return FakeResponse({"imdbID": params.get("i"), "Title": "Arrival", "Response": "True"})
+
+    monkeypatch.setattr(omdb.http_client, "get", fake_get)
+    omdb.memory_cache.clear()
+    omdb.breaker.reset()
+    yield calls
+    omdb.memory_cache.clear()
+
+
+# repeated lookups are served from the in-process LRU
+def test_get_movie_hits_memory_cache(upstream):
+    first = omdb.get_movie("tt2543164")
+    second = omdb.get_movie("tt2543164")
+    assert first == second
+    assert len(upstream) == 1
+
+
+# a cold process reads through to the database tier
+def test_get_movie_falls_back_to_db_cache(upstream):
+    omdb.get_movie("tt2543164")
+    omdb.memory_cache.clear()
+    data = omdb.get_movie("tt2543164")
+    assert data["Title"] == "Arrival"
+    assert len(upstream) == 1
+    assert OmdbCacheEntry.query.count() == 1
+
+
+# expired rows are refetched and overwritten
+def test_expired_entry_is_refetched(upstream):
+    omdb.get_movie("tt2543164")
+    omdb.memory_cache.clear()
+    entry = OmdbCacheEntry.query.first()
+    entry.expires_at = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+
+    omdb.get_movie("tt2543164")
+    assert len(upstream) == 2
+    assert OmdbCacheEntry.query.count() == 1
+
+
+# the database tier is trimmed to its row budget
+def test_db_cache_is_size_bounded(upstream, monkeypatch):
+    monkeypatch.setattr(omdb, "OMDB_CACHE_MAX_ROWS", 2)
+    monkeypatch.setattr(omdb, "OMDB_CACHE_EVICT_EVERY", 1)
+    for imdb_id in ("tt1", "tt2", "tt3"):
+        omdb.get_movie(imdb_id)
+    assert OmdbCacheEntry.query.count() == 2
+
+
+# cache rows are written on their own transaction, leaving the caller's session alone
+def test_cache_write_does_not_touch_caller_session(upstream):
+    db.session.add(Movie(imdb_id="tt2543164", title="Arrival", year="2016", poster="p"))
+    omdb.get_movie("tt2543164")
+    db.session.rollback()
+    assert Movie.query.count() == 0
+    assert OmdbCacheEntry.query.count() == 1
+
+
+@pytest.fixture()
+def search_upstream(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(params["s"])
+        release.wait(2)
+        titles = ["Star Wars", "A Star Is Born", "Lone Star"]
+        return FakeResponse(
+            {
+                "Search": [{"Title": t, "imdbID": f"tt{i}"} for i, t in enumerate(titles)],
+                "totalResults": str(len(titles)),
+                "Response": "True",
+            }
+        )
+
+    monkeypatch.setattr(omdb.http_client, "get", fake_get)
+    omdb.search_cache.clear()
+    omdb.breaker.reset()
+    yield calls, release
+    release.set()
+    omdb.search_cache.clear()
+
+
+# concurrent identical searches share one upstream request
+def test_search_titles_coalesces_concurrent_queries(search_upstream):
+    calls, release = search_upstream
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(omdb.search_titles("Star")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["star"]
+    assert len(results) == 5 and all(len(r) == 3 for r in results)
+
+
+# a longer query is narrowed from a complete cached prefix result
+def test_search_titles_answers_from_cached_prefix(search_upstream):
+    calls, release = search_upstream
+    release.set()
+    omdb.search_titles("star")
+    results = omdb.search_titles("Star W")
+
+    assert calls == ["star"]
+    assert [r["Title"] for r in results] == ["Star Wars"]
+
+
+# the offline stand-in speaks the same protocol the app expects
+def test_standin_serves_fixtures(app_ctx, monkeypatch):
+    from types import SimpleNamespace
+    from http.server import ThreadingHTTPServer
+
+    from perf import omdb_standin
+
+    options = SimpleNamespace(latency_ms=0, jitter_ms=0, error_rate=0, record=False, verbose=False)
+    store = omdb_standin.FixtureStore(omdb_standin.DEFAULT_FIXTURES)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), omdb_standin.make_handler(store, options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(omdb, "OMDB_URL", f"http://127.0.0.1:{server.server_port}/")
+    omdb.breaker.reset()
+    omdb.memory_cache.clear()
+    omdb.search_cache.clear()
+    try:
+        results = omdb.search_titles("zootopia")
+        details = omdb.get_movie(results[0]["imdbID"], plot="full")
+    finally:
+        server.shutdown()
+        server.server_close()
+        omdb.memory_cache.clear()
+        omdb.search_cache.clear()
+
+    assert [r["Title"] for r in results] == ["Zootopia 2"]
+    assert details["Director"] == "Jared Bush, Byron Howard"
+
+
+# once the breaker opens, callers get the last known good data marked stale
+def test_breaker_opens_and_serves_stale(upstream, monkeypatch):
+    omdb.get_movie("tt2543164")
+    entry = OmdbCacheEntry.query.first()
+    entry.expires_at = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+    omdb.memory_cache.clear()
+
+    failures = []
+
+    def failing_get(url, params=None, **kwargs):
+        failures.append(params)
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(omdb.http_client, "get", failing_get)
+    monkeypatch.setattr(omdb.breaker, "failure_threshold", 2)
+
+    for _ in range(4):
+        data = omdb.get_movie("tt2543164")
+        assert data["Title"] == "Arrival"
+        assert data[omdb.STALE_KEY] is True
+
+    assert len(failures) == 2
+    status = omdb.status()
+    assert status["breaker"]["state"] == "open"
+    assert status["breaker"]["short_circuits"] == 2
+    assert status["pending_revalidation"] == 1
+
+    with pytest.raises(omdb.CircuitOpenError):
+        omdb.get_movie("tt-never-cached")
+    omdb.breaker.reset()
+
+
+# error payloads never reach the database tier and never overwrite a good row
+def test_error_payloads_are_not_cached(upstream, monkeypatch):
+    omdb.get_movie("tt2543164")
+    replies = [
+        FakeResponse({"Response": "False", "Error": "Movie not found!"}),
+    ]
+
+    def error_get(url, params=None, **kwargs):
+        upstream.append(params)
+        return replies[0]
+
+    monkeypatch.setattr(omdb.http_client, "get", error_get)
+    data = omdb.get_movie("tt2543164", refresh=True)
+    assert data["Title"] == "Arrival"
+    assert json.loads(OmdbCacheEntry.query.one().payload)["Title"] == "Arrival"
+
+    assert omdb.get_movie("tt-missing")["Error"] == "Movie not found!"
+    assert omdb.get_movie("tt-missing")["Error"] == "Movie not found!"
+    assert len(upstream) == 3
+    assert OmdbCacheEntry.query.count() == 1
+
+    # An exhausted quota counts against the breaker rather than being returned as data
+    limited = FakeResponse({"Response": "False", "Error": "Request limit reached!"})
+    limited.status_code = 401
+    replies[0] = limited
+    with pytest.raises(omdb.OmdbUnavailable):
+        omdb.get_movie("tt-other")
+    assert omdb.breaker.snapshot()["consecutive_failures"] == 1
+    omdb.breaker.reset()
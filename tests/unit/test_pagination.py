@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from models import Booking, Movie, User, db
+
+
+def _seed_bookings():
+    db.session.add(Movie(imdb_id="tt0000024", title="Tenet", year="2020", poster="p"))
+    db.session.add(User(username="alice", password_hash=b"hash", salt=b"salt", role="user"))
+    same_second = datetime(2025, 1, 1, 12, 0, 0)
+    for n in range(5):
+        db.session.add(Booking(
+            movie_title="Tenet" if n % 2 == 0 else "Other",
+            show_date=f"2025-02-0{n + 1}",
+            showtime="7:00 PM",
+            quantity=1,
+            booked_by="alice" if n < 3 else "bob",
+            # Ties on created_at must still page by id
+            created_at=same_second if n < 4 else datetime(2025, 1, 2),
+        ))
+    db.session.commit()
+
+
+def _all_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        data = client.get(url + (f"&cursor={cursor}" if cursor else "")).get_json()
+        ids += [b["id"] for b in data["bookings"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return ids, data["total"]
+
+
+# pages follow (created_at, id) newest first without gaps or repeats, even across timestamp ties
+def test_bookings_keyset_pages(admin_client):
+    _seed_bookings()
+    ids, total = _all_pages(admin_client, "/api/bookings?limit=2")
+    assert ids == [5, 4, 3, 2, 1]
+    assert total == 5
+
+    ids, total = _all_pages(admin_client, "/api/bookings?limit=2&movie=tt0000024&from=2025-02-02")
+    assert (ids, total) == ([5, 3], 2)
+    ids, total = _all_pages(admin_client, "/api/bookings?limit=10&user=alice&to=2025-02-02")
+    assert (ids, total) == ([2, 1], 2)
+
+    # Unknown filters match nothing, not the bookings with no movie or user link
+    empty = {"bookings": [], "next_cursor": None, "total": 0}
+    assert admin_client.get("/api/bookings?movie=tt9999999").get_json() == empty
+    assert admin_client.get("/api/bookings?user=nobody").get_json() == empty
+
+    assert admin_client.get("/api/bookings?limit=0").status_code == 400
+    assert admin_client.get("/api/bookings?cursor=not-a-cursor").status_code == 400
+
+
+# totals come from the cache until a write in this process retires it
+def test_counts_are_cached_and_invalidated(admin_client):
+    _seed_bookings()
+    assert admin_client.get("/api/users?limit=1").get_json()["total"] == 1
+
+    # A write the ORM does not see (another worker, say) only shows up once the entry expires
+    db.session.execute(db.text(
+        "INSERT INTO users (username, password_hash, salt, role) VALUES ('bob', x'00', x'00', 'user')"
+    ))
+    db.session.commit()
+    assert admin_client.get("/api/users?limit=1").get_json()["total"] == 1
+
+    db.session.add(User(username="carol", password_hash=b"hash", salt=b"salt", role="user"))
+    db.session.commit()
+    data = admin_client.get("/api/users?limit=1").get_json()
+    assert data["total"] == 3
+    assert [u["username"] for u in data["users"]] == ["alice"]
+
+    data = admin_client.get(f"/api/users?limit=5&cursor={data['next_cursor']}").get_json()
+    assert [u["username"] for u in data["users"]] == ["bob", "carol"]
+    assert data["next_cursor"] is None
@@ -0,0 +1,53 @@
+import io
+
+import pytest
+from PIL import Image
+
+from models import Movie, db
+from routes import poster_routes
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture()
+def poster_source(app_ctx, tmp_path, monkeypatch):
+    buffer = io.BytesIO()
+    Image.new("RGB", (1000, 1500), "navy").save(buffer, format="JPEG")
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        return FakeResponse(buffer.getvalue())
+
+    monkeypatch.setenv("POSTER_CACHE_DIR", str(tmp_path / "posters"))
+    monkeypatch.setattr(poster_routes.http_client, "get", fake_get)
+    db.session.add(Movie(imdb_id="tt1", title="Poster Movie", year="2025", poster="https://img.test/p.jpg"))
+    db.session.commit()
+    return calls
+
+
+# posters are fetched once, resized, and revalidated with a strong ETag
+def test_poster_is_resized_cached_and_conditional(app_ctx, poster_source):
+    client = app_ctx.test_client()
+
+    first = client.get("/posters/tt1?w=300")
+    assert first.status_code == 200
+    assert Image.open(io.BytesIO(first.data)).width == 320
+    assert "max-age" in first.headers["Cache-Control"]
+    etag = first.headers["ETag"]
+
+    second = client.get("/posters/tt1?w=320", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+
+    client.get("/posters/tt1?w=640")
+    assert poster_source == ["https://img.test/p.jpg"]
+
+
+def test_poster_missing_movie_returns_404(app_ctx):
+    assert app_ctx.test_client().get("/posters/tt404").status_code == 404
@@ -1,6 +1,7 @@
 import json
 import os
 import sys
+from datetime import date
 from pathlib import Path
 
 import pytest
@@ -12,18 +13,15 @@ if str(PROJECT_ROOT) not in sys.path:
 os.environ.setdefault("SECRET_KEY", "test")
 os.environ.setdefault("JWT_SECRET_KEY", "test-jwt")
 os.environ.setdefault("PEPPER", "test-pepper")
-os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 
 from app import app, db
-from models import Booking, User
+from models import Booking, Movie, User
 
 
 @pytest.fixture()
-def client(tmp_path):
-    app.config.update(
-        TESTING=True,
-        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'unit.db'}",
-    )
+def client():
+    # The database itself comes from DATABASE_URL, set in conftest before app is imported
+    app.config.update(TESTING=True)
     with app.app_context():
         db.drop_all()
         db.create_all()
@@ -164,6 +162,51 @@ def test_post_booking_success(client):
         assert saved.quantity == 2
 
 
+# a retried request with the same Idempotency-Key returns the original booking instead of a second one
+def test_post_booking_idempotency_key(client):
+    payload = {"movie_title": "Interstellar", "date": "2025-02-01", "showtime": {"time": "7:00 PM"}, "quantity": 2, "user": "alice"}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/api/bookings", json=payload, headers=headers)
+    second = client.post("/api/bookings", json=payload, headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.get_json()["booking"]["id"] == first.get_json()["booking"]["id"]
+
+    reused = client.post("/api/bookings", json={**payload, "quantity": 3}, headers=headers)
+    assert reused.status_code == 422
+
+    # The same date written without zero padding is the same booking
+    unpadded = client.post("/api/bookings", json={**payload, "date": "2025-2-1"}, headers=headers)
+    assert unpadded.status_code == 201
+    assert unpadded.get_json()["booking"]["id"] == first.get_json()["booking"]["id"]
+
+    # Without a key, identical bookings are separate bookings
+    client.post("/api/bookings", json=payload)
+    with app.app_context():
+        assert Booking.query.count() == 2
+
+
+# dates are stored as real dates, and bookings link to the catalog movie and the account
+def test_post_booking_normalizes_date_and_links(client):
+    with app.app_context():
+        db.session.add(Movie(imdb_id="tt0816692", title="Interstellar", year="2014", poster="p"))
+        db.session.add(User(username="alice", password_hash=b"hash", salt=b"salt", role="user"))
+        db.session.commit()
+
+    payload = {"movie_title": "Interstellar", "date": "2025-02-01", "showtime": {"time": "7:00 PM"}, "quantity": 2, "user": "alice"}
+    response = client.post("/api/bookings", json={**payload, "date": "next friday"})
+    assert response.status_code == 400
+    assert "date must be YYYY-MM-DD." in response.get_json()["errors"]
+
+    assert client.post("/api/bookings", json=payload).get_json()["booking"]["date"] == "2025-02-01"
+    with app.app_context():
+        saved = Booking.query.one()
+        assert saved.show_date == date(2025, 2, 1)
+        assert saved.movie.title == "Interstellar"
+        assert saved.user.username == "alice"
+
+
 # test a missing movie title in booking creation
 def test_post_booking_missing_movie_title(client):
     payload = {"date": "2025-02-01", "showtime": {"time": "7:00 PM"}, "quantity": 2, "user": "alice"}
@@ -241,7 +284,7 @@ def test_update_booking_success_admin_only(client):
     assert body["booking"]["user"] == "booker"
     with app.app_context():
         updated = Booking.query.get(booking_id)
-        assert updated.show_date == "2025-02-02"
+        assert updated.show_date == date(2025, 2, 2)
         assert updated.showtime == "9:00 PM"
         assert updated.quantity == 3
         assert updated.showtime_available == 8
@@ -336,7 +379,7 @@ def test_admin_edit_user_booking(client):
         updated = Booking.query.get(booking_id)
         assert updated.booked_by == "regular_user"
         assert updated.quantity == 4
-        assert updated.show_date == "2025-05-02"
+        assert updated.show_date == date(2025, 5, 2)
         assert updated.showtime == "8:00 PM"
 
 #test admin deleting a user and thus deleting their booking automatically
@@ -369,3 +412,20 @@ def test_admin_delete_user_and_bookings(client):
     with app.app_context():
         assert User.query.get(user_id) is None
         assert Booking.query.get(booking_id) is None
+
+
+# bookings made for a username before the account existed are linked to it on registration
+def test_register_claims_earlier_bookings(client):
+    payload = {"movie_title": "Tenet", "date": "2025-06-01", "showtime": {"time": "7:00 PM"}, "quantity": 1, "user": "latecomer"}
+    booking_id = client.post("/api/bookings", json=payload).get_json()["booking"]["id"]
+    client.post("/register", json={"username": "latecomer", "password": "secret123!"})
+
+    with app.app_context():
+        user = User.query.filter_by(username="latecomer").one()
+        assert db.session.get(Booking, booking_id).user_id == user.id
+        user_id = user.id
+
+    with client.session_transaction() as sess:
+        sess["username"] = "admin"
+        sess["role"] = "admin"
+    assert client.delete(f"/api/users/{user_id}").get_json()["deleted_bookings"] == 1
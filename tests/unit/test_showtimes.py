@@ -0,0 +1,232 @@
+import threading
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import stripe
+
+import holds
+import showtimes
+from models import Booking, Movie, SeatHold, Showtime, db
+
+SHOW_DATE = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.fixture()
+def movie(app_ctx):
+    movie = Movie(imdb_id="tt0000021", title="Black Phone 2", year="2025", poster="p")
+    db.session.add(movie)
+    db.session.commit()
+    return movie
+
+
+def _book(client, quantity, time="5:30 PM", title="Black Phone 2"):
+    return client.post(
+        "/api/bookings",
+        json={
+            "movie_title": title,
+            "date": SHOW_DATE,
+            "showtime": {"time": time, "available": 999},
+            "quantity": quantity,
+            "user": "alice",
+        },
+    )
+
+
+def _remaining(time="5:30 PM"):
+    db.session.expire_all()
+    return Showtime.query.filter_by(show_time=time).first().remaining
+
+
+# seats come off the inventory on booking, overbooking is refused, and cancelling returns them
+def test_booking_decrements_and_cancel_restores(movie, admin_client):
+    response = _book(admin_client, 4)
+    assert response.status_code == 201
+    assert response.get_json()["booking"]["showtime"]["available"] == 5
+    assert _remaining() == 5
+
+    response = _book(admin_client, 6)
+    assert response.status_code == 409
+    assert response.get_json()["available"] == 5
+    assert Booking.query.count() == 1
+
+    booking_id = Booking.query.first().id
+    assert admin_client.delete(f"/api/bookings/{booking_id}").status_code == 200
+    assert _remaining() == 9
+
+
+# concurrent bookings never sell more seats than the showing has
+def test_concurrent_bookings_never_oversell(movie, app_ctx):
+    # In-memory SQLite shares one connection across threads, so their transactions would interleave
+    if db.engine.url.database in (None, "", ":memory:"):
+        pytest.skip("needs a file database so each thread gets its own connection")
+    results = []
+
+    def book():
+        client = app_ctx.test_client()
+        results.append(_book(client, 3).status_code)
+
+    threads = [threading.Thread(target=book) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(201) == 3
+    assert results.count(409) == 3
+    assert _remaining() == 0
+
+
+# editing a booking moves its seats to the new showing
+def test_update_booking_moves_seats(movie, admin_client):
+    _book(admin_client, 2)
+    booking_id = Booking.query.first().id
+
+    response = admin_client.put(f"/api/bookings/{booking_id}", json={"showtime": {"time": "8:00 PM"}, "quantity": 3})
+    assert response.status_code == 200
+    assert _remaining("5:30 PM") == 9
+    assert _remaining("8:00 PM") == 17
+
+    response = admin_client.put(f"/api/bookings/{booking_id}", json={"quantity": 30})
+    assert response.status_code == 409
+    assert _remaining("8:00 PM") == 17
+
+
+# movies outside the catalog keep the old untracked behaviour; availability reflects bookings
+def test_untracked_bookings_and_availability(movie, admin_client):
+    assert _book(admin_client, 50, title="Not In Catalog").status_code == 201
+    assert showtimes.find("Not In Catalog", SHOW_DATE, "5:30 PM") is None
+
+    _book(admin_client, 2, time="2:00 PM")
+    data = admin_client.get(f"/api/showtimes?movie=tt0000021&date={SHOW_DATE}").get_json()
+    assert {s["time"]: s["available"] for s in data["showtimes"]} == {"2:00 PM": 13, "5:30 PM": 9, "8:00 PM": 20}
+
+
+@pytest.fixture()
+def fake_stripe(monkeypatch):
+    sessions = {}
+
+    def create(**kwargs):
+        checkout = {"id": f"cs_{len(sessions) + 1}", "url": "https://stripe.test/pay", **kwargs}
+        sessions[checkout["id"]] = checkout
+        return SimpleNamespace(**checkout)
+
+    monkeypatch.setattr(stripe, "api_key", "sk_test")
+    monkeypatch.setattr(stripe.checkout.Session, "create", create)
+    monkeypatch.setattr(stripe.checkout.Session, "retrieve", lambda session_id: sessions[session_id])
+    monkeypatch.setattr(stripe.checkout.Session, "expire", lambda session_id: sessions.pop(session_id))
+    return sessions
+
+
+def _checkout(client, quantity):
+    return client.post(
+        "/api/bookings/checkout",
+        json={"movie_title": "Black Phone 2", "date": SHOW_DATE, "showtime": {"time": "5:30 PM"}, "quantity": quantity},
+    )
+
+
+# starting checkout holds the seats; paying converts the hold into exactly one booking
+def test_checkout_holds_seats_until_paid(movie, admin_client, fake_stripe):
+    assert _checkout(admin_client, 4).status_code == 200
+    assert _remaining() == 5
+
+    response = _checkout(admin_client, 6)
+    assert response.status_code == 409
+    assert response.get_json()["available"] == 5
+
+    for _ in range(2):
+        assert admin_client.get("/checkout/success?session_id=cs_1").status_code == 200
+    assert Booking.query.count() == 1
+    assert _remaining() == 5
+    hold = SeatHold.query.one()
+    assert (hold.status, hold.booking_id) == ("converted", Booking.query.one().id)
+    assert Booking.query.one().checkout_session_id == "cs_1"
+
+
+# webhook retries for an untracked showing still store a single booking per checkout session
+def test_checkout_session_dedupes_untracked_booking(app_ctx):
+    from routes.booking_routes import _persist_booking_from_metadata
+
+    metadata = {"movie_title": "Not In Catalog", "date": SHOW_DATE, "showtime": "5:30 PM", "quantity": "2", "user": "alice"}
+    first = _persist_booking_from_metadata(metadata, "cs_9")
+    assert _persist_booking_from_metadata(metadata, "cs_9").id == first.id
+    assert _persist_booking_from_metadata(metadata, "cs_10").id != first.id
+    assert Booking.query.count() == 2
+
+
+# cancelled and expired holds give their seats back, and only once
+def test_cancel_and_expiry_release_holds(movie, admin_client, fake_stripe):
+    _checkout(admin_client, 4)
+    _checkout(admin_client, 3)
+    assert _remaining() == 2
+
+    first = SeatHold.query.filter_by(checkout_session_id="cs_1").one()
+    assert admin_client.get(f"/checkout/cancel?hold={first.id}").status_code == 200
+    assert _remaining() == 6
+    assert "cs_1" not in fake_stripe
+
+    # Holds outlive their Stripe session, so nobody can pay for seats the sweeper already returned
+    second = SeatHold.query.filter_by(checkout_session_id="cs_2").one()
+    assert second.expires_at.timestamp() >= fake_stripe["cs_2"]["expires_at"] + holds.SEAT_HOLD_GRACE_SECONDS - 1
+    assert holds.release_expired(datetime.fromtimestamp(fake_stripe["cs_2"]["expires_at"])) == 0
+    assert holds.release_expired(second.expires_at + timedelta(seconds=1)) == 1
+    assert holds.release_expired(datetime.now() + timedelta(days=1)) == 0
+    assert _remaining() == 9
+    assert {h.status for h in SeatHold.query.all()} == {"released"}
+
+
+# a batch is validated up front and written in one go, with a result per item
+def test_batch_create_reports_each_item(movie, admin_client):
+    line = {"movie_title": "Black Phone 2", "date": SHOW_DATE, "showtime": {"time": "5:30 PM"}, "user": "alice"}
+    response = admin_client.post("/api/bookings/batch", json={"bookings": [
+        {**line, "quantity": 4},
+        {**line, "quantity": 0},
+        {**line, "quantity": 4},
+        {**line, "quantity": 4},
+        {**line, "movie_title": "Not In Catalog", "quantity": 50},
+        "not a booking",
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r["status"] for r in data["results"]] == [201, 400, 201, 409, 201, 400]
+    assert data["created"] == 3
+    assert data["results"][3]["available"] == 1
+    assert Booking.query.count() == 3
+    assert _remaining() == 1
+
+    assert admin_client.post("/api/bookings/batch", json={"bookings": []}).status_code == 400
+
+
+# batch create needs a session, and only admins may book for other users
+def test_batch_create_requires_login(movie, app_ctx):
+    line = {"movie_title": "Black Phone 2", "date": SHOW_DATE, "showtime": {"time": "5:30 PM"}, "quantity": 1}
+    client = app_ctx.test_client()
+    assert client.post("/api/bookings/batch", json={"bookings": [line]}).status_code == 401
+
+    with client.session_transaction() as sess:
+        sess["username"] = "alice"
+    data = client.post("/api/bookings/batch", json={"bookings": [line, {**line, "user": "bob"}]}).get_json()
+    assert [r["status"] for r in data["results"]] == [201, 403]
+    assert [b.booked_by for b in Booking.query.all()] == ["alice"]
+    assert _remaining() == 8
+
+
+# batch cancel returns every cancelled seat and skips what the caller may not cancel
+def test_batch_cancel(movie, app_ctx, admin_client):
+    for quantity in (2, 3):
+        _book(admin_client, quantity)
+    other = Booking(movie_title="Other", show_date=SHOW_DATE, showtime="5:30 PM", quantity=1, booked_by="bob")
+    db.session.add(other)
+    db.session.commit()
+    ids = [b.id for b in Booking.query.filter_by(booked_by="alice").all()]
+
+    client = app_ctx.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "alice"
+    response = client.post("/api/bookings/batch-cancel", json={"booking_ids": ids + [ids[0], other.id, 999, "x"]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r["status"] for r in data["results"]] == [200, 200, 400, 403, 404, 400]
+    assert data["cancelled"] == 2
+    assert _remaining() == 9
+    assert [b.booked_by for b in Booking.query.all()] == ["bob"]